@@ -0,0 +1,389 @@
+# benchmark.py
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+STATUS_WEIGHTS = [
+    ("Pending Manager Approval", 10),
+    ("Rejected by Manager", 5),
+    ("Pending Production Support Approval", 10),
+    ("Rejected by Production Support", 5),
+    ("Approved", 5),
+    ("Executed", 60),
+    ("Execution Failed", 5),
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed a DML tool database and benchmark its data access")
+    parser.add_argument("--db", help="Application database to create (default: a temp file)")
+    parser.add_argument("--requests", type=int, default=10000, help="Requests to seed")
+    parser.add_argument("--users", type=int, default=50, help="Users per role to seed")
+    parser.add_argument("--envs", type=int, default=3, help="Local SQLite target environments")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per data-access function")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=25, help="Workflow loops per session")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh interpreters timed for cold start")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON report")
+    return parser.parse_args()
+
+def timing_summary(samples):
+    """Summarize a list of durations in seconds as milliseconds."""
+    ordered = sorted(samples)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    return {
+        "calls": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": percentile(0.95),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return timing_summary(samples)
+
+def seed(app, setup, args, workdir):
+    """Create users, local SQLite targets and a spread of historical requests."""
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+
+    users = {role: [f"{role}{i}" for i in range(1, args.users + 1)]
+             for role in ("requestor", "manager", "support")}
+    for role, names in users.items():
+        for name in names:
+            setup.create_user(name, "password123", role, f"{name}@example.com")
+
+    envs = [f"BENCH{i}" for i in range(1, args.envs + 1)]
+    for env in envs:
+        target_path = os.path.join(workdir, f"{env.lower()}.db")
+        target = sqlite3.connect(target_path)
+        target.execute("CREATE TABLE IF NOT EXISTS accounts (id INTEGER PRIMARY KEY, balance INTEGER)")
+        target.executemany("INSERT OR IGNORE INTO accounts VALUES (?, 0)", [(i,) for i in range(1000)])
+        target.commit()
+        target.close()
+        setup.add_db_connection(env, f"sqlite:///{target_path}", f"Benchmark target {env}")
+
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    now = datetime.datetime.now()
+
+    def rows(count):
+        for _ in range(count):
+            status = rng.choices(statuses, weights)[0]
+            created = now - datetime.timedelta(minutes=rng.randrange(0, 60 * 24 * 365))
+            reviewed = status not in ("Pending Manager Approval",)
+            supported = reviewed and status not in ("Rejected by Manager", "Pending Production Support Approval")
+            executed = status in ("Executed", "Execution Failed")
+            yield (
+                str(uuid.uuid4()), rng.choice(users["requestor"]),
+                f"UPDATE accounts SET balance = balance + {rng.randrange(100)} WHERE id = {rng.randrange(1000)}",
+                rng.choice(envs), "main", status, created,
+                rng.choice(users["manager"]) if reviewed else None,
+                "ok" if reviewed else None,
+                created + datetime.timedelta(hours=1) if reviewed else None,
+                rng.choice(users["support"]) if supported else None,
+                "ok" if supported else None,
+                created + datetime.timedelta(hours=2) if supported else None,
+                created + datetime.timedelta(hours=3) if executed else None,
+                "Success" if status == "Executed" else ("error" if executed else None),
+            )
+
+    remaining = args.requests
+    while remaining > 0:
+        batch = min(remaining, 10000)
+        with app.app_transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO dml_requests
+                (request_id, requestor, dml_statement, target_db, target_schema, status, created_date,
+                 manager_username, manager_comments, manager_action_date,
+                 support_username, support_comments, support_action_date,
+                 execution_date, execution_result)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows(batch)
+            )
+            app.bump_data_version(conn)
+        remaining -= batch
+
+    with app.app_transaction() as conn:
+        conn.execute("ANALYZE")
+
+    return users, envs, time.perf_counter() - started
+
+def benchmark_functions(app, users, envs, args):
+    """Time every data-access function of main.py against the seeded database."""
+    requestor, manager, support = users["requestor"][0], users["manager"][0], users["support"][0]
+    results = {}
+
+    def cold(fn):
+        # Drop cached query results so the database is actually hit
+        def call():
+            app.get_query_cache().clear()
+            return fn()
+        return call
+
+    first_page, cursor = app.get_user_requests(requestor)
+    request_id = first_page[0].request_id if first_page else None
+
+    # A deep cursor, to show keyset pages cost the same far from the start
+    deep_cursor = None
+    for _ in range(20):
+        page, next_cursor = app.get_pending_manager_requests(deep_cursor)
+        if next_cursor is None:
+            break
+        deep_cursor = next_cursor
+
+    cases = {
+        "authenticate": lambda: app.authenticate(requestor, "password123"),
+        "get_pending_manager_requests.cold": cold(app.get_pending_manager_requests),
+        "get_pending_manager_requests.warm": app.get_pending_manager_requests,
+        "get_pending_manager_requests.deep_page": cold(lambda: app.get_pending_manager_requests(deep_cursor)),
+        "get_pending_prod_requests.cold": cold(app.get_pending_prod_requests),
+        "get_approved_requests.cold": cold(app.get_approved_requests),
+        "get_user_requests": lambda: app.get_user_requests(requestor),
+        "get_user_requests.page_2": lambda: app.get_user_requests(requestor, cursor),
+        "get_manager_decisions": lambda: app.get_manager_decisions(manager),
+        "get_request": lambda: app.get_request(request_id),
+        "get_resumable_requests": app.get_resumable_requests,
+        "get_execution_jobs": app.get_execution_jobs,
+        "get_db_connections": app.get_db_connections,
+        "get_data_version": app.get_data_version,
+        "get_stage_latency_summary": app.get_stage_latency_summary,
+        "create_dml_request": lambda: app.create_dml_request(
+            requestor, "UPDATE accounts SET balance = 0 WHERE id = 1", envs[0], "main"
+        ),
+    }
+    for name, fn in cases.items():
+        results[name] = time_calls(fn, args.repeat)
+
+    # Write paths, each on fresh requests
+    def approved_request():
+        new_id = app.create_dml_request(
+            requestor, "UPDATE accounts SET balance = balance + 1 WHERE id < 10", envs[0], "main"
+        )
+        app.update_manager_decision(new_id, manager, True, "bench")
+        app.update_prod_support_decision(new_id, support, True, "bench")
+        return new_id
+
+    for name, fn in {
+        "bulk_manager_decision.50": lambda ids: app.bulk_manager_decision(ids, manager, True, "bench"),
+    }.items():
+        samples = []
+        for _ in range(args.repeat):
+            ids = [app.create_dml_request(requestor, "UPDATE accounts SET balance = 1", envs[0], "main")
+                   for _ in range(50)]
+            started = time.perf_counter()
+            fn(ids)
+            samples.append(time.perf_counter() - started)
+        results[name] = timing_summary(samples)
+
+    for name, fn in {
+        "update_manager_decision": lambda new_id: app.update_manager_decision(new_id, manager, True, "bench"),
+    }.items():
+        samples = []
+        for _ in range(args.repeat):
+            new_id = app.create_dml_request(requestor, "UPDATE accounts SET balance = 1", envs[0], "main")
+            started = time.perf_counter()
+            fn(new_id)
+            samples.append(time.perf_counter() - started)
+        results[name] = timing_summary(samples)
+
+    for name, fn in {
+        "dry_run_dml_request": lambda new_id: app.dry_run_dml_request(new_id, force=True),
+        "execute_dml_request": app.execute_dml_request,
+    }.items():
+        samples = []
+        for _ in range(args.repeat):
+            new_id = approved_request()
+            started = time.perf_counter()
+            fn(new_id)
+            samples.append(time.perf_counter() - started)
+        results[name] = timing_summary(samples)
+
+    return results
+
+def simulate_sessions(app, users, envs, args):
+    """Run N concurrent submit/approve/execute loops and collect per-operation latency."""
+    samples = {"submit": [], "manager_approve": [], "support_approve": [], "execute": [], "list": []}
+    errors = []
+    lock = threading.Lock()
+
+    def timed(operation, fn):
+        started = time.perf_counter()
+        try:
+            return fn()
+        except Exception as e:
+            with lock:
+                errors.append(f"{operation}: {e}")
+        finally:
+            with lock:
+                samples[operation].append(time.perf_counter() - started)
+
+    def session(number):
+        rng = random.Random(args.seed + number)
+        requestor = users["requestor"][number % len(users["requestor"])]
+        manager = users["manager"][number % len(users["manager"])]
+        support = users["support"][number % len(users["support"])]
+
+        for _ in range(args.iterations):
+            request_id = timed("submit", lambda: app.create_dml_request(
+                requestor, f"UPDATE accounts SET balance = balance + 1 WHERE id = {rng.randrange(1000)}",
+                rng.choice(envs), "main"
+            ))
+            timed("list", lambda: app.get_pending_manager_requests())
+            timed("manager_approve", lambda: app.update_manager_decision(request_id, manager, True, "ok"))
+            timed("list", lambda: app.get_pending_prod_requests())
+            timed("support_approve", lambda: app.update_prod_support_decision(request_id, support, True, "ok"))
+            timed("execute", lambda: app.execute_dml_request(request_id))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(number,)) for number in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    workflows = args.sessions * args.iterations
+    return {
+        "sessions": args.sessions,
+        "iterations": args.iterations,
+        "elapsed_s": elapsed,
+        "workflows_per_s": workflows / elapsed if elapsed else None,
+        "operations": {name: timing_summary(values) for name, values in samples.items() if values},
+        "errors": len(errors),
+        "error_samples": errors[:20],
+    }
+
+# Runs in a fresh interpreter: renders the login page with AppTest (cold start), then times
+# reruns end to end and as a bare re-execution of the script
+STARTUP_SCRIPT = """
+import json, logging, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+for name in list(logging.root.manager.loggerDict):
+    if name.startswith("streamlit"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+app_test = AppTest.from_file(sys.argv[1], default_timeout=60)
+app_test.run()
+first_render = time.perf_counter() - started
+loaded = {name: name in sys.modules for name in ("pandas", "sqlalchemy")}
+
+reruns = []
+for _ in range(int(sys.argv[2])):
+    started = time.perf_counter()
+    app_test.run()
+    reruns.append(time.perf_counter() - started)
+
+with open(sys.argv[1]) as f:
+    code = compile(f.read(), sys.argv[1], "exec")
+script_runs = []
+for _ in range(int(sys.argv[2])):
+    started = time.perf_counter()
+    exec(code, {"__name__": "__main__"})
+    script_runs.append(time.perf_counter() - started)
+
+print(json.dumps({"first_render": first_render, "reruns": reruns, "script_runs": script_runs,
+                  "loaded": loaded, "errors": [str(e.value) for e in app_test.exception]}))
+"""
+
+def benchmark_startup(db_path, workdir, args):
+    """Time the login page from a cold interpreter, and the cost of a rerun once warm."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    env = dict(os.environ, DML_APP_DB_PATH=db_path, DML_SCHEDULER_ENABLED="0")
+    first_renders, reruns, script_runs, loaded, errors = [], [], [], {}, []
+    for _ in range(args.startup_runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, script, str(args.repeat)],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        first_renders.append(result["first_render"])
+        reruns.extend(result["reruns"])
+        script_runs.extend(result["script_runs"])
+        loaded = result["loaded"]
+        errors.extend(result["errors"])
+    return {
+        "cold_login_render": timing_summary(first_renders),
+        "apptest_rerun": timing_summary(reruns),
+        "script_rerun": timing_summary(script_runs),
+        "modules_loaded_by_login": loaded,
+        "errors": errors[:20],
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="dml_bench_")
+    db_path = args.db or os.path.join(workdir, "dml_tool.db")
+
+    # The app reads its database location at import time; keep bare-mode Streamlit quiet
+    os.environ["DML_APP_DB_PATH"] = db_path
+    import streamlit
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    import main as app
+    import setup
+
+    app.init_app_db()
+    users, envs, seed_seconds = seed(app, setup, args, workdir)
+    print(f"Seeded {args.requests} requests in {seed_seconds:.1f}s ({db_path})")
+
+    functions = benchmark_functions(app, users, envs, args)
+    print(f"Timed {len(functions)} data-access functions")
+
+    sessions = simulate_sessions(app, users, envs, args)
+    print(f"Simulated {args.sessions} sessions: {sessions['workflows_per_s']:.1f} workflows/s, "
+          f"{sessions['errors']} errors")
+
+    startup = benchmark_startup(db_path, workdir, args)
+    print(f"Cold login render: {startup['cold_login_render']['median_ms']:.0f}ms median, "
+          f"rerun: {startup['script_rerun']['median_ms']:.1f}ms median")
+
+    report = {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "streamlit": getattr(streamlit, "__version__", None),
+        "config": vars(args),
+        "database": db_path,
+        "seed_seconds": seed_seconds,
+        "functions": functions,
+        "sessions": sessions,
+        "startup": startup,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# conformance.py
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+
+# Backends the checks run against: plain SQLite file, and the pooled SQLAlchemy store over a
+# file that every pool connection shares (as same-host replicas would). Neither stands in for
+# replicas on separate hosts, which these stores don't support.
+BACKENDS = {
+    "sqlite": lambda workdir: {"DML_APP_DB_PATH": os.path.join(workdir, "sqlite_store.db")},
+    "pooled": lambda workdir: {"DML_APP_DB_URL": f"sqlite:///{os.path.join(workdir, 'pooled_store.db')}"},
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the application-store conformance checks")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS),
+                        help="Backend to check (repeatable; default: all)")
+    parser.add_argument("--workdir", help="Where to create the store databases (default: a temp dir)")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent workers in the race checks")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def run_threads(count, target):
+    """Run target(index) on count threads released together; return results in index order."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    def worker(index):
+        barrier.wait()
+        results[index] = target(index)
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def check_schema(app, args):
+    app.init_app_db()
+    with app.app_db() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    assert version == len(app.SCHEMA_MIGRATIONS), f"schema at version {version}"
+
+def check_round_trip(app, args):
+    request_id = app.create_dml_request("requestor1", "UPDATE accounts SET balance = 0 WHERE id = 1",
+                                        "DEV", "main")
+    request = app.get_request(request_id)
+    assert request.status == app.STATUS_PENDING_MANAGER, request.status
+    assert request.dml_statement.startswith("UPDATE accounts"), request.dml_statement
+    pending, _ = app.get_pending_manager_requests(page_size=1000)
+    assert request_id in {row.request_id for row in pending}, "request missing from the queue"
+
+def check_rollback(app, args):
+    before = app.get_data_version()
+    try:
+        with app.app_transaction() as conn:
+            conn.execute("INSERT INTO users VALUES ('rollback_user', 'x', 'requestor', 'x')")
+            # A nested block joins the outer transaction, so its failure undoes both writes
+            with app.app_transaction() as inner:
+                app.bump_data_version(inner)
+                raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    with app.app_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users WHERE username = 'rollback_user'").fetchone()[0] == 0
+    assert app.get_data_version() == before, "data version moved on a rolled-back transaction"
+
+def check_stale_decision(app, args):
+    request_id = app.create_dml_request("requestor1", "DELETE FROM accounts WHERE id = 2", "DEV", "main")
+    assert app.update_manager_decision(request_id, "manager1", True, "first")
+    assert not app.update_manager_decision(request_id, "manager2", False, "stale"), "stale decision applied"
+    request = app.get_request(request_id)
+    assert (request.status, request.manager_username) == (app.STATUS_PENDING_PROD, "manager1")
+
+    fresh_id = app.create_dml_request("requestor1", "DELETE FROM accounts WHERE id = 3", "DEV", "main")
+    updated, skipped = app.bulk_manager_decision([request_id, fresh_id, "missing"], "manager1", False, "")
+    assert updated == [fresh_id], updated
+    assert skipped == {request_id: app.STATUS_PENDING_PROD, "missing": "Not found"}, skipped
+
+def check_concurrent_approvers(app, args):
+    request_id = app.create_dml_request("requestor1", "UPDATE accounts SET balance = 1 WHERE id = 4",
+                                        "DEV", "main")
+    results = run_threads(args.threads, lambda index: app.update_manager_decision(
+        request_id, f"manager{index}", index % 2 == 0, f"decision {index}"
+    ))
+    winners = [index for index, won in enumerate(results) if won]
+    assert len(winners) == 1, f"{len(winners)} approvers won the race"
+    assert app.get_request(request_id).manager_username == f"manager{winners[0]}"
+
+def check_concurrent_writers(app, args):
+    per_thread = 20
+    before = app.get_data_version()
+    created = run_threads(args.threads, lambda index: [
+        app.create_dml_request(f"requestor{index}", f"UPDATE accounts SET balance = {n} WHERE id = {index}",
+                               "DEV", "main")
+        for n in range(per_thread)
+    ])
+    request_ids = [request_id for batch in created for request_id in batch]
+    placeholders = ", ".join("?" * len(request_ids))
+    with app.app_db() as conn:
+        stored = conn.execute(
+            f"SELECT COUNT(*) FROM dml_requests WHERE request_id IN ({placeholders})", request_ids
+        ).fetchone()[0]
+    assert stored == len(request_ids) == args.threads * per_thread, f"{stored} of {len(request_ids)} stored"
+    assert app.get_data_version() >= before + len(request_ids), "data version missed writes"
+
+def check_dry_run_leaves_target(app, args):
+    import setup
+    
+    target_path = os.path.abspath("dry_run_target.db")
+    with sqlite3.connect(target_path) as target:
+        target.execute("DROP TABLE IF EXISTS a")
+        target.execute("CREATE TABLE a (id INTEGER PRIMARY KEY, v INTEGER)")
+        target.executemany("INSERT INTO a VALUES (?, 0)", [(n,) for n in range(10)])
+    setup.add_db_connection("DRYRUN", f"sqlite:///{target_path}", "dry-run target")
+    
+    # pysqlite would autocommit these WITH-led statements outside any transaction
+    for statement, expected in [
+        ("WITH q AS (SELECT 5) DELETE FROM a WHERE id IN (SELECT * FROM q)", 1),
+        ("WITH q AS (SELECT 3) UPDATE a SET v = 1 WHERE id > (SELECT * FROM q)", 6),
+    ]:
+        request_id = app.create_dml_request("requestor1", statement, "DRYRUN", "main")
+        estimate, error = app.dry_run_dml_request(request_id, force=True, mode="rollback")
+        assert error is None, error
+        assert estimate["estimated_rows"] == expected, estimate["estimated_rows"]
+        with sqlite3.connect(target_path) as target:
+            state = target.execute("SELECT COUNT(*), SUM(v) FROM a").fetchone()
+        assert state == (10, 0), f"dry run of {statement!r} changed the target: {state}"
+
+def check_connections_released(app, args):
+    stats = app.get_app_store_stats()
+    if "checked_out" in stats:
+        assert stats["checked_out"] == 0, f"{stats['checked_out']} pooled connections still checked out"
+
+CHECKS = [
+    check_schema,
+    check_round_trip,
+    check_rollback,
+    check_stale_decision,
+    check_concurrent_approvers,
+    check_concurrent_writers,
+    check_dry_run_leaves_target,
+    check_connections_released,
+]
+
+def run_checks(args):
+    """Run every check against the store configured in the environment; print one JSON line each."""
+    import main as app
+    import setup
+
+    app.init_app_db()
+    setup.create_user("requestor1", "password123", "requestor", "requestor1@example.com")
+    failed = 0
+    for check in CHECKS:
+        try:
+            check(app, args)
+            outcome = {"check": check.__name__, "ok": True}
+        except Exception:
+            failed += 1
+            outcome = {"check": check.__name__, "ok": False, "error": traceback.format_exc()}
+        print(json.dumps(outcome), flush=True)
+    app.flush_metrics()
+    return failed
+
+def run_backend(name, args, workdir):
+    """Run the checks in a fresh interpreter pointed at one backend."""
+    env = dict(os.environ, DML_SCHEDULER_ENABLED="0", DML_APP_DB_URL="")
+    env.update(BACKENDS[name](workdir))
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--threads", str(args.threads)]
+    completed = subprocess.run(command, env=env, cwd=workdir, capture_output=True, text=True)
+
+    outcomes = []
+    for line in completed.stdout.splitlines():
+        if line.startswith("{"):
+            outcomes.append(json.loads(line))
+    if completed.returncode and not any(not outcome["ok"] for outcome in outcomes):
+        outcomes.append({"check": "run", "ok": False, "error": completed.stderr[-2000:]})
+    return outcomes
+
+def main():
+    args = parse_args()
+    if args.child:
+        sys.exit(1 if run_checks(args) else 0)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="dml_conformance_")
+    failed = 0
+    for name in args.backend or sorted(BACKENDS):
+        for outcome in run_backend(name, args, workdir):
+            print(f"[{name}] {outcome['check']}: {'ok' if outcome['ok'] else 'FAILED'}")
+            if not outcome["ok"]:
+                failed += 1
+                print(outcome["error"])
+    print(f"{failed} failure(s); databases in {workdir}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,62 @@
 import streamlit as st
-import pandas as pd
 import sqlite3
 import datetime
-import sqlalchemy
+import importlib
 import uuid
-from sqlalchemy import create_engine
+import zlib
+import csv
+import io
+import itertools
 import hashlib
+import json
+import re
+import atexit
 import os
-from dotenv import load_dotenv
+import socket
+import threading
+import time
+import weakref
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager, nullcontext
 
-# Load environment variables (database connections, etc.)
-load_dotenv()
+# Stand-in for a heavy module that is imported on first attribute access, so pages that never
+# touch it (like the login page) don't pay for the import
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+pd = LazyModule("pandas")
+sqlalchemy = LazyModule("sqlalchemy")
+
+# Optional: only the Parquet export needs pyarrow
+pa = LazyModule("pyarrow")
+pq = LazyModule("pyarrow.parquet")
+
+# Load environment variables (database connections, etc.) once per process
+@st.cache_resource
+def load_environment():
+    from dotenv import load_dotenv
+    load_dotenv()
+    return True
+
+load_environment()
+
+logger = logging.getLogger("dml_tool")
+
+# Connection pool settings for the target databases
+ENGINE_POOL_SIZE = int(os.getenv("DML_ENGINE_POOL_SIZE", "5"))
+ENGINE_MAX_OVERFLOW = int(os.getenv("DML_ENGINE_MAX_OVERFLOW", "10"))
+ENGINE_POOL_TIMEOUT = int(os.getenv("DML_ENGINE_POOL_TIMEOUT", "30"))
+ENGINE_POOL_RECYCLE = int(os.getenv("DML_ENGINE_POOL_RECYCLE", "1800"))
 
 # Status constants
 STATUS_PENDING_MANAGER = "Pending Manager Approval"
@@ -18,9 +64,38 @@ STATUS_REJECTED_MANAGER = "Rejected by Manager"
 STATUS_PENDING_PROD = "Pending Production Support Approval"
 STATUS_REJECTED_PROD = "Rejected by Production Support"
 STATUS_APPROVED = "Approved"
+STATUS_EXECUTING = "Executing"
 STATUS_EXECUTED = "Executed"
 STATUS_FAILED = "Execution Failed"
 
+# Background execution job states
+JOB_QUEUED = "Queued"
+JOB_RUNNING = "Running"
+JOB_SUCCEEDED = "Succeeded"
+JOB_FAILED = "Failed"
+JOB_CANCELLED = "Cancelled"
+JOB_TIMED_OUT = "Timed Out"
+JOB_INTERRUPTED = "Interrupted"
+JOB_ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+# Multi-environment rollout modes and per-target states
+ROLLOUT_CONCURRENT = "concurrent"
+ROLLOUT_GATED = "gated"
+TARGET_PENDING = "Pending"
+TARGET_SKIPPED = "Skipped"
+
+# Scheduled execution states
+SCHEDULE_PENDING = "Scheduled"
+SCHEDULE_RUNNING = "Running"
+SCHEDULE_DONE = "Done"
+SCHEDULE_FAILED = "Failed"
+SCHEDULE_SKIPPED = "Skipped"
+SCHEDULE_CANCELLED = "Cancelled"
+
+# How a grouped execution commits: all requests in one transaction, or each in its own savepoint
+GROUP_ATOMIC = "atomic"
+GROUP_SAVEPOINT = "savepoint"
+
 # Initialize session state for authentication
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
@@ -31,238 +106,3803 @@ if 'role' not in st.session_state:
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "login"
 
-# Database connection for the application itself
-def get_app_db_connection():
-    conn = sqlite3.connect('dml_tool.db')
-    return conn
+# Background execution settings. EXECUTOR_ENV_CONCURRENCY bounds everything this process runs
+# against one target at a time: background jobs, grouped executions and scheduled groups.
+EXECUTOR_WORKERS = int(os.getenv("DML_EXECUTOR_WORKERS", "4"))
+EXECUTOR_ENV_CONCURRENCY = int(os.getenv("DML_EXECUTOR_ENV_CONCURRENCY", "2"))
+EXECUTOR_REQUEUE_DELAY = float(os.getenv("DML_EXECUTOR_REQUEUE_DELAY", "1.0"))
+EXECUTOR_STATUS_REFRESH_INTERVAL = float(os.getenv("DML_EXECUTOR_STATUS_REFRESH_INTERVAL", "2"))
+EXECUTION_TIMEOUT = int(os.getenv("DML_EXECUTION_TIMEOUT", "600"))
+EXECUTION_BATCH_SIZE = int(os.getenv("DML_EXECUTION_BATCH_SIZE", "500"))
+
+# App processes (replicas) sharing one app store stamp the jobs and scheduled requests they run
+# with their id and refresh a heartbeat on them; another replica only fails running work for
+# review once its heartbeat is older than EXECUTION_OWNER_TIMEOUT
+REPLICA_ID = os.getenv("DML_REPLICA_ID") or f"{socket.gethostname()}:{os.getpid()}"
+EXECUTION_HEARTBEAT_INTERVAL = float(os.getenv("DML_EXECUTION_HEARTBEAT_INTERVAL", "15"))
+EXECUTION_OWNER_TIMEOUT = float(os.getenv("DML_EXECUTION_OWNER_TIMEOUT", "90"))
+
+# Background loops (heartbeat, scheduler) that fail log the error and wait twice as long after
+# each consecutive failure, up to this many seconds, before trying again
+BACKGROUND_RETRY_MAX_DELAY = float(os.getenv("DML_BACKGROUND_RETRY_MAX_DELAY", "300"))
+
+# Maintenance-window scheduler: due requests are grouped per target, each group runs on one
+# pooled connection in one of the target's execution slots (shared with background jobs), at
+# most SCHEDULER_TARGET_RATE request starts per minute per target (0 for no limit)
+SCHEDULER_ENABLED = os.getenv("DML_SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_POLL_INTERVAL = float(os.getenv("DML_SCHEDULER_POLL_INTERVAL", "30"))
+SCHEDULER_WORKERS = int(os.getenv("DML_SCHEDULER_WORKERS", "4"))
+SCHEDULER_TARGET_RATE = float(os.getenv("DML_SCHEDULER_TARGET_RATE", "30"))
+SCHEDULER_BATCH_LIMIT = int(os.getenv("DML_SCHEDULER_BATCH_LIMIT", "200"))
+
+# Dry-run settings: "rollback" executes inside a rolled-back transaction to count rows,
+# "explain" only asks the target for a plan
+DRY_RUN_MODE = os.getenv("DML_DRY_RUN_MODE", "rollback")
+DRY_RUN_TIMEOUT = int(os.getenv("DML_DRY_RUN_TIMEOUT", "60"))
+DRY_RUN_CACHE_TTL = int(os.getenv("DML_DRY_RUN_CACHE_TTL", "3600"))
+
+# Bulk import settings
+IMPORT_BATCH_SIZE = int(os.getenv("DML_IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("DML_IMPORT_MAX_ERRORS", "100"))
+
+# Archival settings: terminal requests older than the retention move to dml_requests_archive,
+# with text bodies of at least ARCHIVE_COMPRESS_MIN_CHARS stored zlib-compressed
+ARCHIVE_RETENTION_DAYS = int(os.getenv("DML_ARCHIVE_RETENTION_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("DML_ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_COMPRESS_MIN_CHARS = int(os.getenv("DML_ARCHIVE_COMPRESS_MIN_CHARS", "256"))
+
+# Full-text search: unscoped searches rank only the newest SEARCH_MAX_CANDIDATES matches,
+# which keeps very broad terms fast on large histories
+SEARCH_MAX_CANDIDATES = int(os.getenv("DML_SEARCH_MAX_CANDIDATES", "5000"))
+
+# Timing metrics settings
+METRICS_FLUSH_SIZE = int(os.getenv("DML_METRICS_FLUSH_SIZE", "200"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("DML_METRICS_FLUSH_INTERVAL", "10"))
+METRICS_RETENTION_DAYS = int(os.getenv("DML_METRICS_RETENTION_DAYS", "14"))
+
+# Application database settings
+APP_DB_PATH = os.getenv("DML_APP_DB_PATH", "dml_tool.db")
+APP_DB_BUSY_TIMEOUT_MS = int(os.getenv("DML_APP_DB_BUSY_TIMEOUT_MS", "10000"))
+APP_DB_CACHE_SIZE_KB = int(os.getenv("DML_APP_DB_CACHE_SIZE_KB", "16384"))
+APP_DB_MMAP_SIZE = int(os.getenv("DML_APP_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+APP_DB_MAX_IDLE = int(os.getenv("DML_APP_DB_MAX_IDLE", "8"))
+APP_DB_LOCK_RETRIES = int(os.getenv("DML_APP_DB_LOCK_RETRIES", "5"))
+
+# Optional SQLAlchemy URL for a pooled application store (used instead of APP_DB_PATH when set).
+# The schema and queries are SQLite's, so only sqlite:/// URLs are supported, and since WAL
+# needs shared memory every process using the file must run on the same host: replicas on
+# one host can share it, replicas on different hosts (e.g. over a network filesystem) cannot.
+APP_DB_URL = os.getenv("DML_APP_DB_URL", "")
+APP_DB_POOL_SIZE = int(os.getenv("DML_APP_DB_POOL_SIZE", "5"))
+APP_DB_MAX_OVERFLOW = int(os.getenv("DML_APP_DB_MAX_OVERFLOW", "10"))
+APP_DB_POOL_TIMEOUT = int(os.getenv("DML_APP_DB_POOL_TIMEOUT", "30"))
+
+# Rows per page on the list pages
+PAGE_SIZE = int(os.getenv("DML_PAGE_SIZE", "50"))
+
+# Maximum number of cached queue query results
+QUERY_CACHE_SIZE = int(os.getenv("DML_QUERY_CACHE_SIZE", "256"))
+
+# Change feed: queue pages held in a session replay at most CHANGE_FEED_MAX_DELTA changes
+# before re-reading the page; auto-refresh checks for new changes every POLL_INTERVAL seconds.
+# Changes older than the retention are pruned.
+CHANGE_FEED_MAX_DELTA = int(os.getenv("DML_CHANGE_FEED_MAX_DELTA", "500"))
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("DML_CHANGE_FEED_POLL_INTERVAL", "1.0"))
+CHANGE_FEED_RETENTION_DAYS = int(os.getenv("DML_CHANGE_FEED_RETENTION_DAYS", "7"))
+
+# Similar (same fingerprint) requests listed next to a request under review
+SIMILAR_REQUESTS_LIMIT = int(os.getenv("DML_SIMILAR_REQUESTS_LIMIT", "20"))
+
+# Audit export: rows per chunk (and Parquet row group), and where exports are written. Exports
+# up to the download limit can be fetched from the page; the archive job deletes page exports
+# older than the retention.
+EXPORT_CHUNK_SIZE = int(os.getenv("DML_EXPORT_CHUNK_SIZE", "10000"))
+EXPORT_DIR = os.getenv("DML_EXPORT_DIR", "exports")
+EXPORT_DOWNLOAD_MAX_MB = float(os.getenv("DML_EXPORT_DOWNLOAD_MAX_MB", "100"))
+EXPORT_RETENTION_HOURS = float(os.getenv("DML_EXPORT_RETENTION_HOURS", "24"))
+
+# Workflow analytics: hourly rollup buckets are pruned after this long, daily ones are kept
+WORKFLOW_HOURLY_RETENTION_DAYS = int(os.getenv("DML_WORKFLOW_HOURLY_RETENTION_DAYS", "35"))
+
+# Characters of the DML statement shown in list tables
+STATEMENT_PREVIEW_CHARS = int(os.getenv("DML_STATEMENT_PREVIEW_CHARS", "120"))
+
+# Columns fetched for list pages: summary fields plus a statement preview and its size.
+# The full statement and result are loaded per request by get_request.
+REQUEST_SUMMARY_FIELDS = """
+    request_id, requestor, target_db, target_schema, status, created_date,
+    manager_username, manager_action_date, support_username, support_action_date,
+    execution_date, estimated_rows, plan_cost
+"""
+REQUEST_SUMMARY_COLUMNS = REQUEST_SUMMARY_FIELDS + f""",
+    substr(dml_statement, 1, {STATEMENT_PREVIEW_CHARS}) AS statement_preview,
+    length(dml_statement) AS statement_size
+"""
+
+# Archived rows keep their preview and size in columns, so listing them needs no decompression
+ARCHIVE_SUMMARY_COLUMNS = REQUEST_SUMMARY_FIELDS + ", statement_preview, statement_size"
+
+# Per-thread handle on a reusable application database connection
+class _AppConnectionHolder:
+    __slots__ = ("conn", "depth", "users", "finalizer", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 0
+        self.users = 0
+        self.finalizer = None
+
+# Tune a fresh SQLite connection to the application database
+def configure_sqlite_connection(conn):
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{APP_DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {APP_DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout = {APP_DB_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+# Application store interface: hands each thread one DB-API connection at a time and runs
+# nested transaction() blocks as a single transaction. Backends supply _checkout/_release.
+class AppStore:
+    # Statement that opens a write transaction, or None if the driver opens one implicitly
+    begin_statement = None
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _checkout(self):
+        raise NotImplementedError
+
+    def _release(self, conn):
+        raise NotImplementedError
+
+    def _idle(self, holder):
+        # Called when the thread's outermost session ends; by default the thread keeps its connection
+        pass
+
+    def _holder(self):
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = _AppConnectionHolder(self._checkout())
+            holder.finalizer = weakref.finalize(holder, self._release, holder.conn)
+            self._local.holder = holder
+        return holder
+
+    @contextmanager
+    def session(self):
+        holder = self._holder()
+        holder.users += 1
+        try:
+            yield holder.conn
+        finally:
+            holder.users -= 1
+            if holder.users == 0:
+                self._idle(holder)
+
+    @contextmanager
+    def transaction(self):
+        with self.session() as conn:
+            holder = self._local.holder
+            
+            # Nested calls join the outer transaction
+            if holder.depth == 0:
+                self._begin(conn)
+            holder.depth += 1
+            try:
+                yield conn
+            except BaseException:
+                holder.depth -= 1
+                if holder.depth == 0:
+                    conn.rollback()
+                raise
+            holder.depth -= 1
+            if holder.depth == 0:
+                conn.commit()
+
+    def _begin(self, conn):
+        if self.begin_statement:
+            conn.execute(self.begin_statement)
+
+    def dispose(self):
+        holder = getattr(self._local, "holder", None)
+        if holder is not None:
+            self._local.holder = None
+            holder.finalizer()
+
+    def stats(self):
+        return {"backend": type(self).__name__}
+
+# SQLite file store with thread-local, reusable connections (the single-instance default)
+class AppDatabase(AppStore):
+    begin_statement = "BEGIN IMMEDIATE"
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._idle_conns = []
+
+    def _open(self):
+        # Autocommit mode: transactions are started explicitly by transaction()
+        conn = sqlite3.connect(
+            self.path,
+            timeout=APP_DB_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        configure_sqlite_connection(conn)
+        return conn
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle_conns:
+                return self._idle_conns.pop()
+        return self._open()
+
+    def _release(self, conn):
+        # Called when the owning thread goes away; keep a few connections warm
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle_conns) < APP_DB_MAX_IDLE:
+                self._idle_conns.append(conn)
+                return
+        conn.close()
+
+    def _begin(self, conn):
+        # Take the write lock up front so writers queue on busy_timeout instead of
+        # failing on a read-to-write upgrade; retry a few times if still locked
+        for attempt in range(APP_DB_LOCK_RETRIES):
+            try:
+                conn.execute(self.begin_statement)
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or attempt == APP_DB_LOCK_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * (2 ** attempt))
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle_conns)
+        return {"backend": type(self).__name__, "path": self.path, "idle_connections": idle}
+
+# Store reached through a SQLAlchemy connection pool, which app processes on the same host may
+# share. A thread holds a pooled connection only for the length of its outermost session, and
+# concurrent writers are kept apart by status-guarded UPDATEs rather than a process lock.
+# The schema, migrations and queries use SQLite SQL, so the URL must be a local SQLite file.
+class SQLAlchemyAppStore(AppStore):
+    begin_statement = "BEGIN IMMEDIATE"
+
+    def __init__(self, url):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._proxies = {}
+        url = sqlalchemy.engine.make_url(url)
+        self.url = url.render_as_string(hide_password=True)
+        if url.get_backend_name() != "sqlite":
+            raise ValueError(
+                f"DML_APP_DB_URL must be a sqlite:/// URL; the application store uses SQLite SQL "
+                f"and does not support the {url.get_backend_name()!r} backend"
+            )
+        
+        # Same connection settings as AppDatabase, shared across pool threads
+        self.engine = sqlalchemy.create_engine(
+            url,
+            pool_pre_ping=True,
+            pool_recycle=ENGINE_POOL_RECYCLE,
+            pool_size=APP_DB_POOL_SIZE,
+            max_overflow=APP_DB_MAX_OVERFLOW,
+            pool_timeout=APP_DB_POOL_TIMEOUT,
+            poolclass=sqlalchemy.pool.QueuePool,
+            connect_args={
+                "isolation_level": None,
+                "check_same_thread": False,
+                "timeout": APP_DB_BUSY_TIMEOUT_MS / 1000,
+            },
+        )
+        sqlalchemy.event.listen(
+            self.engine, "connect", lambda dbapi_conn, record: configure_sqlite_connection(dbapi_conn)
+        )
+
+    def _checkout(self):
+        # Hand out the driver's own connection (pandas and the rest of the code expect a plain
+        # DB-API connection) and keep the pool's proxy to return it with
+        proxy = self.engine.raw_connection()
+        conn = proxy.driver_connection
+        with self._lock:
+            self._proxies[id(conn)] = proxy
+        return conn
+
+    def _release(self, conn):
+        # Returning the connection to the pool rolls back anything left open
+        with self._lock:
+            proxy = self._proxies.pop(id(conn))
+        proxy.close()
+
+    def _idle(self, holder):
+        self._local.holder = None
+        holder.finalizer()
+
+    def stats(self):
+        pool = self.engine.pool
+        return {
+            "backend": type(self).__name__,
+            "url": self.url,
+            "status": pool.status(),
+            "checked_out": pool.checkedout(),
+        }
+
+# Store for the configured backend: the pooled SQLAlchemy store when DML_APP_DB_URL is set,
+# otherwise the local SQLite file
+def create_app_store():
+    if APP_DB_URL:
+        return SQLAlchemyAppStore(APP_DB_URL)
+    return AppDatabase(APP_DB_PATH)
+
+# Shared application store handle (survives Streamlit reruns)
+@st.cache_resource
+def get_app_db():
+    return create_app_store()
+
+# Read from the application database
+@contextmanager
+def app_db():
+    with get_app_db().session() as conn:
+        yield conn
+
+# Run a block of application database writes in one transaction
+@contextmanager
+def app_transaction():
+    with get_app_db().transaction() as conn:
+        yield conn
+
+# Backend and connection statistics for the application store
+def get_app_store_stats():
+    return get_app_db().stats()
+
+# Buffered recorder for stage timings, flushed to the metrics table in batches
+class MetricsRecorder:
+    def __init__(self, flush_size, flush_interval):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._last_purge = 0.0
+
+    def record(self, stage, target_db, duration_ms):
+        with self._lock:
+            self._buffer.append((stage, target_db, duration_ms, datetime.datetime.now()))
+            due = (len(self._buffer) >= self.flush_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            samples, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            purge = self._last_flush - self._last_purge >= 3600
+            if purge:
+                self._last_purge = self._last_flush
+        if not samples and not purge:
+            return
+        
+        with app_transaction() as conn:
+            conn.executemany(
+                "INSERT INTO metrics (stage, target_db, duration_ms, recorded_at) VALUES (?, ?, ?, ?)",
+                samples
+            )
+            if purge:
+                conn.execute(
+                    "DELETE FROM metrics WHERE recorded_at < ?",
+                    (datetime.datetime.now() - datetime.timedelta(days=METRICS_RETENTION_DAYS),)
+                )
+
+# Shared metrics recorder (survives Streamlit reruns); whatever is buffered is written at exit
+@st.cache_resource
+def get_metrics_recorder():
+    recorder = MetricsRecorder(METRICS_FLUSH_SIZE, METRICS_FLUSH_INTERVAL)
+    atexit.register(recorder.flush)
+    return recorder
+
+# Time a block of code as one sample of the given stage
+@contextmanager
+def stage_timer(stage, target_db=None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_metrics_recorder().record(stage, target_db, (time.perf_counter() - started) * 1000)
+
+# Time every call of a function as one sample of the given stage
+def timed(stage):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Write any buffered timings now
+def flush_metrics():
+    get_metrics_recorder().flush()
+
+# Latency percentiles per stage and target over the last `hours` (nearest-rank, in SQL)
+def get_stage_latency_summary(hours=24):
+    since = datetime.datetime.now() - datetime.timedelta(hours=hours)
+    with app_db() as conn:
+        return pd.read_sql_query(
+            """
+            WITH ranked AS (
+                SELECT stage, COALESCE(target_db, '') AS target_db, duration_ms,
+                       ROW_NUMBER() OVER (PARTITION BY stage, target_db ORDER BY duration_ms) AS rank,
+                       COUNT(*) OVER (PARTITION BY stage, target_db) AS samples
+                FROM metrics WHERE recorded_at >= ?
+            )
+            SELECT stage, target_db, MAX(samples) AS samples,
+                   MIN(CASE WHEN rank >= 0.50 * samples THEN duration_ms END) AS p50_ms,
+                   MIN(CASE WHEN rank >= 0.95 * samples THEN duration_ms END) AS p95_ms,
+                   MIN(CASE WHEN rank >= 0.99 * samples THEN duration_ms END) AS p99_ms,
+                   MAX(duration_ms) AS max_ms
+            FROM ranked
+            GROUP BY stage, target_db
+            ORDER BY stage, target_db
+            """,
+            conn, params=(since,)
+        )
+
+# pysqlite only opens a transaction implicitly for statements that start with INSERT, UPDATE,
+# DELETE or REPLACE, so e.g. a WITH ... DELETE would commit on its own and escape rollbacks.
+# Turn that off and have SQLAlchemy issue BEGIN itself.
+def _sqlite_disable_implicit_transactions(dbapi_conn, connection_record):
+    dbapi_conn.isolation_level = None
+
+def _sqlite_begin(db_conn):
+    db_conn.exec_driver_sql("BEGIN")
+
+# Create a pooled engine for a target database
+def create_pooled_engine(connection_string):
+    options = {
+        "pool_pre_ping": True,
+        "pool_recycle": ENGINE_POOL_RECYCLE,
+    }
+    is_sqlite = sqlalchemy.engine.make_url(connection_string).get_backend_name() == "sqlite"
+    # SQLite targets use SQLAlchemy's default file/thread pools, which don't take sizing options
+    if not is_sqlite:
+        options.update(
+            pool_size=ENGINE_POOL_SIZE,
+            max_overflow=ENGINE_MAX_OVERFLOW,
+            pool_timeout=ENGINE_POOL_TIMEOUT,
+        )
+    engine = sqlalchemy.create_engine(connection_string, **options)
+    if is_sqlite:
+        sqlalchemy.event.listen(engine, "connect", _sqlite_disable_implicit_transactions)
+        sqlalchemy.event.listen(engine, "begin", _sqlite_begin)
+    return engine
+
+# Process-wide registry of pooled engines, keyed by db_connections.env_name
+class EngineRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "checkouts": 0,
+            "checkout_wait_total": 0.0,
+            "checkout_wait_max": 0.0,
+        }
+
+    def get_engine(self, env_name, connection_string):
+        with self._lock:
+            entry = self._engines.get(env_name)
+            if entry is not None and entry[0] == connection_string:
+                self._stats["hits"] += 1
+                return entry[1]
+            
+            # The connection string changed (or was never seen), so rebuild the engine
+            self._stats["misses"] += 1
+            if entry is not None:
+                entry[1].dispose()
+                self._stats["invalidations"] += 1
+            engine = create_pooled_engine(connection_string)
+            self._engines[env_name] = (connection_string, engine)
+            return engine
+
+    def invalidate(self, env_name=None):
+        with self._lock:
+            names = list(self._engines) if env_name is None else [env_name]
+            for name in names:
+                entry = self._engines.pop(name, None)
+                if entry is not None:
+                    entry[1].dispose()
+                    self._stats["invalidations"] += 1
+
+    @contextmanager
+    def connect(self, env_name, connection_string):
+        with stage_timer("target.engine", env_name):
+            engine = self.get_engine(env_name, connection_string)
+        
+        started = time.perf_counter()
+        with stage_timer("target.connect", env_name):
+            db_conn = engine.connect()
+        waited = time.perf_counter() - started
+        
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["checkout_wait_total"] += waited
+            self._stats["checkout_wait_max"] = max(self._stats["checkout_wait_max"], waited)
+        
+        try:
+            yield db_conn
+        finally:
+            db_conn.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            engines = dict(self._engines)
+        
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["checkout_wait_avg"] = (
+            stats["checkout_wait_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        )
+        stats["pools"] = {
+            name: {
+                "status": engine.pool.status(),
+                "checked_out": getattr(engine.pool, "checkedout", lambda: None)(),
+            }
+            for name, (_, engine) in engines.items()
+        }
+        return stats
+
+# Shared engine registry (survives Streamlit reruns)
+@st.cache_resource
+def get_engine_registry():
+    return EngineRegistry()
+
+# Drop cached engines after a connection string changes
+def invalidate_engine(env_name=None):
+    get_engine_registry().invalidate(env_name)
+
+# Pool hit/miss and checkout-wait statistics
+def get_engine_pool_stats():
+    return get_engine_registry().stats()
+
+# Initialize application database
+def init_app_db():
+    # Nothing to do once the schema is current, so don't take the write lock
+    with app_db() as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= len(SCHEMA_MIGRATIONS):
+            return
+    
+    with app_transaction() as conn:
+        cursor = conn.cursor()
+        
+        # Create users table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL,
+            email TEXT NOT NULL
+        )
+        ''')
+        
+        # Create requests table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dml_requests (
+            request_id TEXT PRIMARY KEY,
+            requestor TEXT NOT NULL,
+            dml_statement TEXT NOT NULL,
+            target_db TEXT NOT NULL,
+            target_schema TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_date TIMESTAMP NOT NULL,
+            manager_username TEXT,
+            manager_comments TEXT,
+            manager_action_date TIMESTAMP,
+            support_username TEXT,
+            support_comments TEXT,
+            support_action_date TIMESTAMP,
+            execution_date TIMESTAMP,
+            execution_result TEXT
+        )
+        ''')
+        
+        # Create db_connections table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS db_connections (
+            env_name TEXT PRIMARY KEY,
+            connection_string TEXT NOT NULL,
+            description TEXT
+        )
+        ''')
+        
+        # Bring the schema up to date
+        migrate_app_db(conn)
+
+# Index every existing request, active and archived, in the full-text search table
+def _backfill_request_search(conn):
+    for table in ("dml_requests", "dml_requests_archive"):
+        rows = conn.execute(
+            f"""
+            SELECT request_id, requestor, dml_statement, manager_comments,
+                   support_comments, execution_result
+            FROM {table}
+            """
+        )
+        for request_id, requestor, statement, manager_comments, support_comments, result in rows:
+            conn.execute(
+                "INSERT OR IGNORE INTO request_search_docs (request_id, requestor) VALUES (?, ?)",
+                (request_id, requestor)
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO request_search
+                (rowid, dml_statement, manager_comments, support_comments, execution_result)
+                SELECT doc_id, ?, ?, ?, ? FROM request_search_docs WHERE request_id = ?
+                """,
+                (decompress_text(statement), manager_comments, support_comments,
+                 decompress_text(result), request_id)
+            )
+
+# Fingerprint and index the statements of every existing active request
+def _backfill_statement_index(conn):
+    index_request_statements(conn, conn.execute("SELECT request_id, dml_statement FROM dml_requests").fetchall())
+
+# Lower bounds (seconds) of the latency histogram bins behind the approximate percentiles:
+# 0, then 1 second growing by 2 ** 0.25 per bin (about 19%) to beyond two years
+WORKFLOW_LATENCY_BINS = [0.0] + [2 ** (k / 4) for k in range(105)]
+
+# Rollup bucket sizes and the strftime format that truncates a timestamp to its bucket
+WORKFLOW_GRANULARITIES = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+
+# Outcome recorded for the status that ends a workflow stage
+WORKFLOW_OUTCOMES = {
+    STATUS_PENDING_PROD: "approved",
+    STATUS_REJECTED_MANAGER: "rejected",
+    STATUS_APPROVED: "approved",
+    STATUS_REJECTED_PROD: "rejected",
+    STATUS_EXECUTED: "executed",
+    STATUS_FAILED: "failed",
+}
+
+# Turnaround stages, each measured from created_date: (stage, column holding the date the
+# stage ended, user it is attributed to, statuses it leaves, statuses ending it). A request
+# whose status has since moved on counts under the first ending status: approved for the
+# review stages, failed for an execution that is being resumed.
+WORKFLOW_STAGES = (
+    ("manager", "manager_action_date", "manager_username", (STATUS_PENDING_MANAGER,),
+     (STATUS_PENDING_PROD, STATUS_REJECTED_MANAGER)),
+    ("support", "support_action_date", "support_username", (STATUS_PENDING_PROD,),
+     (STATUS_APPROVED, STATUS_REJECTED_PROD)),
+    ("execution", "execution_date", "support_username", (STATUS_APPROVED, STATUS_EXECUTING),
+     (STATUS_FAILED, STATUS_EXECUTED)),
+)
+
+# Quote a constant for inlining into trigger and migration SQL
+def sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+# SQL terms for one stage of request alias row (joined to workflow_granularities g): the
+# rollup key up to the approver, the outcome and the latency in seconds
+def _workflow_terms(stage, row):
+    name, date_column, user_column, _, end_statuses = stage
+    dimensions = (
+        f"g.granularity, strftime(g.bucket_format, {row}.{date_column}), {sql_literal(name)}, "
+        f"{row}.target_db, COALESCE({row}.{user_column}, '')"
+    )
+    outcome = "CASE {}.status {} ELSE {} END".format(
+        row,
+        " ".join(f"WHEN {sql_literal(status)} THEN {sql_literal(WORKFLOW_OUTCOMES[status])}"
+                 for status in end_statuses),
+        sql_literal(WORKFLOW_OUTCOMES[end_statuses[0]])
+    )
+    latency = f"MAX((julianday({row}.{date_column}) - julianday({row}.created_date)) * 86400, 0)"
+    return dimensions, outcome, latency
+
+# Upserts adding the rows selected by source (a FROM clause over request alias row joined
+# to workflow_granularities g) to the rollups and latency histogram of one stage
+def _workflow_rollup_sql(stage, row, source):
+    dimensions, outcome, latency = _workflow_terms(stage, row)
+    return [
+        f"""
+        INSERT INTO workflow_rollups (granularity, bucket_start, stage, target_db, approver, outcome,
+                                      transitions, total_seconds, min_seconds, max_seconds)
+        SELECT {dimensions}, {outcome}, COUNT(*), SUM({latency}), MIN({latency}), MAX({latency})
+        FROM {source}
+        GROUP BY 1, 2, 3, 4, 5, 6
+        ON CONFLICT (granularity, bucket_start, stage, target_db, approver, outcome) DO UPDATE SET
+            transitions = transitions + excluded.transitions,
+            total_seconds = total_seconds + excluded.total_seconds,
+            min_seconds = MIN(min_seconds, excluded.min_seconds),
+            max_seconds = MAX(max_seconds, excluded.max_seconds)
+        """,
+        f"""
+        INSERT INTO workflow_latency_histogram (granularity, bucket_start, stage, target_db, approver,
+                                                bin, transitions)
+        SELECT {dimensions}, (SELECT MAX(bin) FROM workflow_latency_bins WHERE lower_seconds <= {latency}),
+               COUNT(*)
+        FROM {source}
+        GROUP BY 1, 2, 3, 4, 5, 6
+        ON CONFLICT (granularity, bucket_start, stage, target_db, approver, bin) DO UPDATE SET
+            transitions = transitions + excluded.transitions
+        """,
+    ]
+
+# Statements taking back what an earlier end of the stage, recorded on request alias row,
+# added to the rollups, for a request that goes through the stage again (a resumed execution).
+# Buckets left empty are dropped; min and max can't be taken back and stay as they were.
+def _workflow_retraction_sql(stage, row):
+    dimensions, outcome, latency = _workflow_terms(stage, row)
+    source = f"FROM workflow_granularities g WHERE {row}.{stage[1]} IS NOT NULL"
+    rollup_key = f"""
+        (granularity, bucket_start, stage, target_db, approver, outcome) IN (
+            SELECT {dimensions}, {outcome} {source}
+        )
+        """
+    histogram_key = f"""
+        (granularity, bucket_start, stage, target_db, approver, bin) IN (
+            SELECT {dimensions}, (SELECT MAX(bin) FROM workflow_latency_bins WHERE lower_seconds <= {latency})
+            {source}
+        )
+        """
+    return [
+        f"""
+        UPDATE workflow_rollups SET transitions = transitions - 1, total_seconds = total_seconds - {latency}
+        WHERE {rollup_key}
+        """,
+        f"UPDATE workflow_latency_histogram SET transitions = transitions - 1 WHERE {histogram_key}",
+        f"DELETE FROM workflow_rollups WHERE transitions <= 0 AND {rollup_key}",
+        f"DELETE FROM workflow_latency_histogram WHERE transitions <= 0 AND {histogram_key}",
+    ]
+
+# Trigger folding each transition that ends a stage into the rollups as it happens. Only a
+# transition that records a new end date counts, so e.g. cancelling a queued resume (which
+# fails the request again without running it) doesn't; a stage ended before is taken back.
+def _workflow_rollup_trigger(stage):
+    name, date_column, _, from_statuses, end_statuses = stage
+    condition = (
+        f"old.status IN ({', '.join(map(sql_literal, from_statuses))}) "
+        f"AND new.status IN ({', '.join(map(sql_literal, end_statuses))}) "
+        f"AND old.{date_column} IS NOT new.{date_column}"
+    )
+    statements = _workflow_retraction_sql(stage, "old") + _workflow_rollup_sql(
+        stage, "new", f"workflow_granularities g WHERE new.{date_column} IS NOT NULL"
+    )
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS workflow_rollup_{name}
+        AFTER UPDATE OF status ON dml_requests
+        WHEN {condition}
+        BEGIN
+            {"; ".join(statement.strip() for statement in statements)};
+        END
+        """
+
+# Seed the histogram bins and roll up every finished stage of existing requests, active and archived
+def _backfill_workflow_rollups(conn):
+    conn.executemany(
+        "INSERT OR IGNORE INTO workflow_latency_bins (bin, lower_seconds) VALUES (?, ?)",
+        list(enumerate(WORKFLOW_LATENCY_BINS))
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO workflow_granularities (granularity, bucket_format) VALUES (?, ?)",
+        list(WORKFLOW_GRANULARITIES.items())
+    )
+    for table in ("dml_requests", "dml_requests_archive"):
+        for stage in WORKFLOW_STAGES:
+            source = f"{table} r, workflow_granularities g WHERE r.{stage[1]} IS NOT NULL"
+            for statement in _workflow_rollup_sql(stage, "r", source):
+                conn.execute(statement)
+
+# Schema migrations, applied in order; PRAGMA user_version records the last one applied
+SCHEMA_MIGRATIONS = [
+    # 1: indexes backing the list pages and their keyset pagination
+    [
+        """
+        CREATE INDEX IF NOT EXISTS idx_dml_requests_status_created
+        ON dml_requests (status, created_date, request_id)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_dml_requests_requestor_created
+        ON dml_requests (requestor, created_date, request_id)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_dml_requests_manager_action
+        ON dml_requests (manager_username, manager_action_date, request_id)
+        """,
+    ],
+    # 2: key/value application state, starting with the data version used by the query cache
+    [
+        """
+        CREATE TABLE IF NOT EXISTS app_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO app_state (key, value) VALUES ('data_version', 0)",
+    ],
+    # 3: persisted background execution jobs
+    [
+        """
+        CREATE TABLE IF NOT EXISTS execution_jobs (
+            job_id TEXT PRIMARY KEY,
+            request_id TEXT NOT NULL,
+            target_db TEXT NOT NULL,
+            status TEXT NOT NULL,
+            submitted_by TEXT NOT NULL,
+            submitted_date TIMESTAMP NOT NULL,
+            started_date TIMESTAMP,
+            finished_date TIMESTAMP,
+            timeout_seconds INTEGER NOT NULL,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            message TEXT
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_execution_jobs_status_submitted
+        ON execution_jobs (status, submitted_date)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_execution_jobs_request
+        ON execution_jobs (request_id, submitted_date)
+        """,
+    ],
+    # 4: chunked execution progress and per-batch checkpoints
+    [
+        "ALTER TABLE dml_requests ADD COLUMN statement_count INTEGER",
+        "ALTER TABLE dml_requests ADD COLUMN statements_executed INTEGER",
+        "ALTER TABLE dml_requests ADD COLUMN rows_affected INTEGER",
+        "ALTER TABLE execution_jobs ADD COLUMN resume INTEGER NOT NULL DEFAULT 0",
+        """
+        CREATE TABLE IF NOT EXISTS execution_checkpoints (
+            request_id TEXT NOT NULL,
+            batch_index INTEGER NOT NULL,
+            first_statement INTEGER NOT NULL,
+            statement_count INTEGER NOT NULL,
+            rows_affected INTEGER NOT NULL,
+            committed_date TIMESTAMP NOT NULL,
+            PRIMARY KEY (request_id, batch_index)
+        )
+        """,
+    ],
+    # 5: dry-run estimates on requests, cached by (statement hash, target_db, target_schema)
+    [
+        "ALTER TABLE dml_requests ADD COLUMN estimated_rows INTEGER",
+        "ALTER TABLE dml_requests ADD COLUMN plan_cost REAL",
+        "ALTER TABLE dml_requests ADD COLUMN dry_run_plan TEXT",
+        "ALTER TABLE dml_requests ADD COLUMN dry_run_date TIMESTAMP",
+        """
+        CREATE TABLE IF NOT EXISTS dry_run_cache (
+            statement_hash TEXT NOT NULL,
+            target_db TEXT NOT NULL,
+            target_schema TEXT NOT NULL,
+            estimated_rows INTEGER,
+            plan_cost REAL,
+            plan TEXT,
+            created_date TIMESTAMP NOT NULL,
+            PRIMARY KEY (statement_hash, target_db, target_schema)
+        )
+        """,
+    ],
+    # 6: multi-environment rollouts; per-target state lives in request_targets
+    [
+        "ALTER TABLE dml_requests ADD COLUMN rollout_mode TEXT",
+        """
+        CREATE TABLE IF NOT EXISTS request_targets (
+            request_id TEXT NOT NULL,
+            target_db TEXT NOT NULL,
+            stage INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            execution_date TIMESTAMP,
+            execution_result TEXT,
+            rows_affected INTEGER,
+            PRIMARY KEY (request_id, target_db)
+        )
+        """,
+    ],
+    # 7: stage timing samples for the operations metrics page
+    [
+        """
+        CREATE TABLE IF NOT EXISTS metrics (
+            id INTEGER PRIMARY KEY,
+            stage TEXT NOT NULL,
+            target_db TEXT,
+            duration_ms REAL NOT NULL,
+            recorded_at TIMESTAMP NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_metrics_recorded ON metrics (recorded_at)",
+    ],
+    # 8: recent-jobs listing
+    [
+        "CREATE INDEX IF NOT EXISTS idx_execution_jobs_submitted ON execution_jobs (submitted_date)",
+    ],
+    # 9: cold storage for terminal requests; large text bodies are stored as zlib BLOBs
+    [
+        """
+        CREATE TABLE IF NOT EXISTS dml_requests_archive (
+            request_id TEXT PRIMARY KEY,
+            requestor TEXT NOT NULL,
+            dml_statement BLOB NOT NULL,
+            target_db TEXT NOT NULL,
+            target_schema TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_date TIMESTAMP NOT NULL,
+            manager_username TEXT,
+            manager_comments TEXT,
+            manager_action_date TIMESTAMP,
+            support_username TEXT,
+            support_comments TEXT,
+            support_action_date TIMESTAMP,
+            execution_date TIMESTAMP,
+            execution_result BLOB,
+            statement_count INTEGER,
+            statements_executed INTEGER,
+            rows_affected INTEGER,
+            estimated_rows INTEGER,
+            plan_cost REAL,
+            dry_run_plan BLOB,
+            dry_run_date TIMESTAMP,
+            rollout_mode TEXT,
+            statement_preview TEXT NOT NULL,
+            statement_size INTEGER NOT NULL,
+            archived_date TIMESTAMP NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_dml_requests_archive_requestor_created
+        ON dml_requests_archive (requestor, created_date, request_id)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_dml_requests_archive_manager_action
+        ON dml_requests_archive (manager_username, manager_action_date, request_id)
+        """,
+    ],
+    # 10: full-text search over statements, comments and results. Documents are keyed by
+    # request_search_docs so they survive archival; triggers keep them in step with dml_requests.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS request_search_docs (
+            doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id TEXT NOT NULL UNIQUE,
+            requestor TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_request_search_docs_requestor ON request_search_docs (requestor)",
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS request_search USING fts5 (
+            dml_statement, manager_comments, support_comments, execution_result,
+            tokenize = "unicode61 tokenchars '_'",
+            prefix = '2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS dml_requests_search_insert
+        AFTER INSERT ON dml_requests
+        BEGIN
+            INSERT OR IGNORE INTO request_search_docs (request_id, requestor)
+            VALUES (new.request_id, new.requestor);
+            INSERT OR REPLACE INTO request_search
+            (rowid, dml_statement, manager_comments, support_comments, execution_result)
+            SELECT doc_id, new.dml_statement, new.manager_comments,
+                   new.support_comments, new.execution_result
+            FROM request_search_docs WHERE request_id = new.request_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS dml_requests_search_update
+        AFTER UPDATE OF dml_statement, manager_comments, support_comments, execution_result
+        ON dml_requests
+        BEGIN
+            UPDATE request_search
+            SET dml_statement = new.dml_statement,
+                manager_comments = new.manager_comments,
+                support_comments = new.support_comments,
+                execution_result = new.execution_result
+            WHERE rowid = (SELECT doc_id FROM request_search_docs WHERE request_id = new.request_id);
+        END
+        """,
+        _backfill_request_search,
+    ],
+    # 11: scheduled executions, with an earliest start and an optional daily window
+    [
+        """
+        CREATE TABLE IF NOT EXISTS execution_schedules (
+            request_id TEXT PRIMARY KEY,
+            target_db TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            not_before TIMESTAMP NOT NULL,
+            window_start TEXT,
+            window_end TEXT,
+            status TEXT NOT NULL,
+            scheduled_by TEXT NOT NULL,
+            scheduled_date TIMESTAMP NOT NULL,
+            started_date TIMESTAMP,
+            finished_date TIMESTAMP,
+            message TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_execution_schedules_due ON execution_schedules (status, not_before)",
+    ],
+    # 12: append-only change log of request status transitions (and dry-run updates), written
+    # by triggers so every writer is covered; a NULL new_status means the request was archived
+    [
+        """
+        CREATE TABLE IF NOT EXISTS request_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id TEXT NOT NULL,
+            old_status TEXT,
+            new_status TEXT,
+            changed_date TIMESTAMP NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS dml_requests_change_insert
+        AFTER INSERT ON dml_requests
+        BEGIN
+            INSERT INTO request_changes (request_id, old_status, new_status, changed_date)
+            VALUES (new.request_id, NULL, new.status, datetime('now', 'localtime'));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS dml_requests_change_update
+        AFTER UPDATE OF status, dry_run_date ON dml_requests
+        WHEN old.status IS NOT new.status OR old.dry_run_date IS NOT new.dry_run_date
+        BEGIN
+            INSERT INTO request_changes (request_id, old_status, new_status, changed_date)
+            VALUES (new.request_id, old.status, new.status, datetime('now', 'localtime'));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS dml_requests_change_delete
+        AFTER DELETE ON dml_requests
+        BEGIN
+            INSERT INTO request_changes (request_id, old_status, new_status, changed_date)
+            VALUES (old.request_id, old.status, NULL, datetime('now', 'localtime'));
+        END
+        """,
+    ],
+    # 13: statement fingerprints (literal-free normalized SQL) with the tables and operations
+    # each request touches, and the per-statement analysis they are computed from
+    [
+        "ALTER TABLE dml_requests ADD COLUMN statement_hash TEXT",
+        "ALTER TABLE dml_requests ADD COLUMN fingerprint TEXT",
+        "ALTER TABLE dml_requests_archive ADD COLUMN statement_hash TEXT",
+        "ALTER TABLE dml_requests_archive ADD COLUMN fingerprint TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_dml_requests_fingerprint ON dml_requests (fingerprint, created_date)",
+        """
+        CREATE INDEX IF NOT EXISTS idx_dml_requests_archive_fingerprint
+        ON dml_requests_archive (fingerprint, created_date)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS statement_analysis (
+            statement_hash TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            normalized TEXT NOT NULL,
+            operations TEXT NOT NULL,
+            tables TEXT NOT NULL,
+            analyzed_date TIMESTAMP NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS request_tables (
+            table_name TEXT NOT NULL,
+            request_id TEXT NOT NULL,
+            PRIMARY KEY (table_name, request_id)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS request_operations (
+            operation TEXT NOT NULL,
+            request_id TEXT NOT NULL,
+            PRIMARY KEY (operation, request_id)
+        ) WITHOUT ROWID
+        """,
+        _backfill_statement_index,
+    ],
+    # 14: workflow turnaround rollups per hour/day bucket, stage, environment, approver and
+    # outcome, with a latency histogram per bucket for approximate percentiles. Triggers keep
+    # them current on every stage-ending status transition.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS workflow_granularities (
+            granularity TEXT PRIMARY KEY,
+            bucket_format TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS workflow_latency_bins (
+            bin INTEGER PRIMARY KEY,
+            lower_seconds REAL NOT NULL UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS workflow_rollups (
+            granularity TEXT NOT NULL,
+            bucket_start TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            target_db TEXT NOT NULL,
+            approver TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            transitions INTEGER NOT NULL,
+            total_seconds REAL NOT NULL,
+            min_seconds REAL NOT NULL,
+            max_seconds REAL NOT NULL,
+            PRIMARY KEY (granularity, bucket_start, stage, target_db, approver, outcome)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS workflow_latency_histogram (
+            granularity TEXT NOT NULL,
+            bucket_start TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            target_db TEXT NOT NULL,
+            approver TEXT NOT NULL,
+            bin INTEGER NOT NULL,
+            transitions INTEGER NOT NULL,
+            PRIMARY KEY (granularity, bucket_start, stage, target_db, approver, bin)
+        ) WITHOUT ROWID
+        """,
+        _backfill_workflow_rollups,
+    ] + [_workflow_rollup_trigger(stage) for stage in WORKFLOW_STAGES],
+    # 15: created-date order over the whole history, for the chunked audit export
+    [
+        "CREATE INDEX IF NOT EXISTS idx_dml_requests_created ON dml_requests (created_date, request_id)",
+        """
+        CREATE INDEX IF NOT EXISTS idx_dml_requests_archive_created
+        ON dml_requests_archive (created_date, request_id)
+        """,
+    ],
+    # 16: the replica running each job or scheduled request, and when it last checked in,
+    # so a replica only recovers work whose owner has stopped checking in
+    [
+        "ALTER TABLE execution_jobs ADD COLUMN owner TEXT",
+        "ALTER TABLE execution_jobs ADD COLUMN heartbeat_date TIMESTAMP",
+        "ALTER TABLE execution_schedules ADD COLUMN owner TEXT",
+        "ALTER TABLE execution_schedules ADD COLUMN heartbeat_date TIMESTAMP",
+    ],
+    # 17: execution rollups count each request's latest real outcome once; rebuild them without
+    # the cancelled resumes and repeated attempts the first trigger counted
+    [f"DROP TRIGGER IF EXISTS workflow_rollup_{stage[0]}" for stage in WORKFLOW_STAGES] + [
+        "DELETE FROM workflow_rollups",
+        "DELETE FROM workflow_latency_histogram",
+        _backfill_workflow_rollups,
+    ] + [_workflow_rollup_trigger(stage) for stage in WORKFLOW_STAGES],
+    # 18: rollouts stored their targets comma-joined in target_db; keep the first (the earliest
+    # stage) so every target_db names a real environment, then rebuild the rollups keyed on it
+    [
+        f"""
+        UPDATE {table} SET target_db = substr(target_db, 1, instr(target_db, ',') - 1)
+        WHERE instr(target_db, ',') > 0
+        """
+        for table in ("dml_requests", "dml_requests_archive", "execution_jobs", "execution_schedules")
+    ] + [f"DROP TRIGGER IF EXISTS workflow_rollup_{stage[0]}" for stage in WORKFLOW_STAGES] + [
+        "DELETE FROM workflow_rollups",
+        "DELETE FROM workflow_latency_histogram",
+        _backfill_workflow_rollups,
+    ] + [_workflow_rollup_trigger(stage) for stage in WORKFLOW_STAGES],
+]
+
+# Apply any schema migrations the database hasn't seen yet
+def migrate_app_db(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    for number, steps in enumerate(SCHEMA_MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        for step in steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+        conn.execute(f"PRAGMA user_version = {number}")
+
+# Current data version; every write to dml_requests moves it forward
+def get_data_version():
+    with app_db() as conn:
+        row = conn.execute("SELECT value FROM app_state WHERE key = 'data_version'").fetchone()
+    return row[0] if row else 0
+
+# Bump the data version inside the caller's write transaction
+def bump_data_version(conn):
+    conn.execute("UPDATE app_state SET value = value + 1 WHERE key = 'data_version'")
+
+# LRU cache of query results, keyed on the data version they were read at
+class QueryCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get_or_load(self, key, version, load):
+        with self._lock:
+            # Everything cached at an older version is stale
+            if version != self._version:
+                if self._entries:
+                    self._stats["invalidations"] += len(self._entries)
+                self._entries.clear()
+                self._version = version
+            
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+            self._stats["misses"] += 1
+        
+        value = load()
+        
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = value
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), version=self._version)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+# Shared query cache (survives Streamlit reruns and is shared by all sessions)
+@st.cache_resource
+def get_query_cache():
+    return QueryCache(QUERY_CACHE_SIZE)
+
+# Hit/miss statistics for the query cache
+def get_query_cache_stats():
+    return get_query_cache().stats()
+
+# Cache a read function's results until the data version changes
+def versioned_query(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        return get_query_cache().get_or_load(key, get_data_version(), lambda: fn(*args, **kwargs))
+    return wrapper
+
+# Every column of a request, in table order; archived rows are read back into the same shape
+REQUEST_FIELDS = (
+    "request_id", "requestor", "dml_statement", "target_db", "target_schema", "status",
+    "created_date", "manager_username", "manager_comments", "manager_action_date",
+    "support_username", "support_comments", "support_action_date", "execution_date",
+    "execution_result", "statement_count", "statements_executed", "rows_affected",
+    "estimated_rows", "plan_cost", "dry_run_plan", "dry_run_date", "rollout_mode",
+    "statement_hash", "fingerprint",
+)
+
+# One full request: an immutable slotted tuple with attribute access
+class RequestRecord(namedtuple("RequestRecord", REQUEST_FIELDS)):
+    __slots__ = ()
+
+# Lightweight row type for a list query's column set (one namedtuple class per set)
+@functools.lru_cache(maxsize=None)
+def row_type(fields):
+    return namedtuple("RequestRow", fields)
+
+# Run a query and return its rows as namedtuples named after the result columns
+def fetch_rows(conn, sql, params=()):
+    cursor = conn.execute(sql, params)
+    make_row = row_type(tuple(column[0] for column in cursor.description))._make
+    return [make_row(row) for row in cursor]
+
+# Run one keyset-page query (page_size + 1 rows) against dml_requests or its archive
+def _query_request_page(table, columns, where, params, sort_column, descending, cursor, page_size):
+    order = "DESC" if descending else "ASC"
+    sql = f"SELECT {columns} FROM {table} WHERE {where}"
+    params = tuple(params)
+    
+    if cursor is not None:
+        sql += f" AND ({sort_column}, request_id) {'<' if descending else '>'} (?, ?)"
+        params += tuple(cursor)
+    
+    sql += f" ORDER BY {sort_column} {order}, request_id {order} LIMIT ?"
+    params += (page_size + 1,)
+    
+    with app_db() as conn:
+        return fetch_rows(conn, sql, params)
+
+# Trim a page_size + 1 result to one page and work out the cursor for the next one
+def _finish_page(rows, sort_column, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = (getattr(last, sort_column), last.request_id)
+    return rows, next_cursor
+
+# Fetch one keyset page of requests ordered by (sort_column, request_id).
+# Returns the page and the cursor for the next one (None on the last page).
+def fetch_request_page(where, params, sort_column, descending=False, cursor=None,
+                       page_size=PAGE_SIZE, columns=REQUEST_SUMMARY_COLUMNS):
+    rows = _query_request_page(
+        "dml_requests", columns, where, params, sort_column, descending, cursor, page_size
+    )
+    return _finish_page(rows, sort_column, page_size)
+
+# Iterate over every request matching a filter, one keyset page at a time
+def iter_requests(where, params, sort_column, descending=False, page_size=PAGE_SIZE,
+                  columns=REQUEST_SUMMARY_COLUMNS):
+    cursor = None
+    while True:
+        rows, cursor = fetch_request_page(where, params, sort_column, descending, cursor, page_size, columns)
+        yield from rows
+        if cursor is None:
+            return
+
+# Fetch one newest-first page of request history, reading the archive only once the page
+# reaches back as far as the newest archived row matching the filter
+def fetch_history_page(where, params, sort_column, cursor=None, page_size=PAGE_SIZE, extra_columns=""):
+    hot = _query_request_page(
+        "dml_requests", REQUEST_SUMMARY_COLUMNS + extra_columns, where, params,
+        sort_column, True, cursor, page_size
+    )
+    
+    with app_db() as conn:
+        watermark = conn.execute(
+            f"SELECT MAX({sort_column}) FROM dml_requests_archive WHERE {where}", tuple(params)
+        ).fetchone()[0]
+    
+    # Every row of this page is newer than anything archived: the archive can't contribute
+    if watermark is None or (len(hot) > page_size and getattr(hot[page_size - 1], sort_column) > watermark):
+        return _finish_page(hot, sort_column, page_size)
+    
+    cold = _query_request_page(
+        "dml_requests_archive", ARCHIVE_SUMMARY_COLUMNS + extra_columns, where, params,
+        sort_column, True, cursor, page_size
+    )
+    merged = sorted(hot + cold, key=lambda row: (getattr(row, sort_column), row.request_id), reverse=True)
+    return _finish_page(merged[:page_size + 1], sort_column, page_size)
+
+# Sequence number of the latest logged change (0 before the first)
+def get_change_seq():
+    with app_db() as conn:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM request_changes").fetchone()[0]
+
+# Changes logged after seq, oldest first. Returns None when there are more than limit of them
+# or some were pruned, in which case the caller should re-read instead of replaying.
+def get_changes_since(seq, limit=CHANGE_FEED_MAX_DELTA):
+    with app_db() as conn:
+        changes = fetch_rows(
+            conn,
+            """
+            SELECT seq, request_id, old_status, new_status FROM request_changes
+            WHERE seq > ? ORDER BY seq LIMIT ?
+            """,
+            (seq, limit + 1)
+        )
+        if len(changes) > limit:
+            return None
+        if changes and changes[0].seq != seq + 1:
+            oldest = conn.execute("SELECT MIN(seq) FROM request_changes").fetchone()[0]
+            if oldest > seq + 1:
+                return None
+    return changes
+
+# Bring a held page of a status queue (ordered by sort_column, request_id) up to date from a
+# list of changes: requests that left the status drop out, requests that entered it are read
+# and slotted in if they fall inside the page. Returns (rows, next_cursor), or None when the
+# page has shrunk below a full page and has to be re-read.
+def refresh_queue_page(rows, cursor, next_cursor, status, changes, sort_column="created_date",
+                       page_size=PAGE_SIZE):
+    final_status = {}
+    for change in changes:
+        if status in (change.old_status, change.new_status) or change.request_id in final_status:
+            final_status[change.request_id] = change.new_status
+    if not final_status:
+        return rows, next_cursor
+    
+    kept = [row for row in rows if row.request_id not in final_status]
+    
+    entered = tuple(request_id for request_id, new_status in final_status.items() if new_status == status)
+    if entered:
+        with app_db() as conn:
+            added = fetch_rows(
+                conn,
+                f"""
+                SELECT {REQUEST_SUMMARY_COLUMNS} FROM dml_requests
+                WHERE status = ? AND request_id IN ({", ".join("?" * len(entered))})
+                """,
+                (status,) + entered
+            )
+        for row in added:
+            key = (getattr(row, sort_column), row.request_id)
+            if (cursor is None or key > tuple(cursor)) and (next_cursor is None or key <= tuple(next_cursor)):
+                kept.append(row)
+        kept.sort(key=lambda row: (getattr(row, sort_column), row.request_id))
+    
+    if len(kept) > page_size:
+        kept = kept[:page_size]
+        return kept, (getattr(kept[-1], sort_column), kept[-1].request_id)
+    if len(kept) < page_size and next_cursor is not None:
+        return None
+    return kept, next_cursor
+
+# Drop change-log entries older than retention_days
+def prune_request_changes(retention_days=CHANGE_FEED_RETENTION_DAYS):
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+    with app_transaction() as conn:
+        return conn.execute("DELETE FROM request_changes WHERE changed_date < ?", (cutoff,)).rowcount
+
+# Start of the rollup bucket holding a moment, in the form bucket_start is stored in
+def workflow_bucket(granularity, moment):
+    return moment.strftime(WORKFLOW_GRANULARITIES[granularity])
+
+# Filter on the rollup tables for buckets since a bucket start, optionally for one environment
+def _workflow_filter(granularity, since, target_db):
+    where, params = "granularity = ? AND bucket_start >= ?", (granularity, since)
+    if target_db:
+        where += " AND target_db = ?"
+        params += (target_db,)
+    return where, params
+
+# Transitions and summed latency per bucket, stage and outcome since a bucket start
+@timed("db.analytics")
+@versioned_query
+def get_workflow_rollups(granularity, since, target_db=None):
+    where, params = _workflow_filter(granularity, since, target_db)
+    with app_db() as conn:
+        return fetch_rows(
+            conn,
+            f"""
+            SELECT bucket_start, stage, outcome, SUM(transitions) AS transitions,
+                   SUM(total_seconds) AS total_seconds
+            FROM workflow_rollups WHERE {where}
+            GROUP BY bucket_start, stage, outcome
+            ORDER BY bucket_start, stage, outcome
+            """,
+            params
+        )
+
+# Approximate latency at a fraction of a histogram given as [(bin, count)] in bin order,
+# interpolated within the bin holding that rank and clamped to the observed range
+def approximate_percentile(histogram, fraction, low, high):
+    rank = fraction * sum(count for _, count in histogram)
+    seen = 0
+    for latency_bin, count in histogram:
+        if seen + count >= rank:
+            lower = WORKFLOW_LATENCY_BINS[latency_bin]
+            upper = WORKFLOW_LATENCY_BINS[latency_bin + 1] if latency_bin + 1 < len(WORKFLOW_LATENCY_BINS) else high
+            estimate = lower + (upper - lower) * (rank - seen) / count
+            return min(max(estimate, low), high)
+        seen += count
+    return high
+
+# Turnaround per stage and environment or approver since a bucket start: count, mean, approximate
+# p50/p90/p99 and max, in minutes
+@timed("db.analytics")
+@versioned_query
+def get_workflow_latency(granularity, since, group_by="target_db", target_db=None):
+    if group_by not in ("target_db", "approver"):
+        raise ValueError(f"Can't group workflow latency by {group_by}")
+    where, params = _workflow_filter(granularity, since, target_db)
+    
+    with app_db() as conn:
+        totals = conn.execute(
+            f"""
+            SELECT stage, {group_by}, SUM(transitions), SUM(total_seconds), MIN(min_seconds), MAX(max_seconds)
+            FROM workflow_rollups WHERE {where}
+            GROUP BY stage, {group_by}
+            ORDER BY stage, {group_by}
+            """,
+            params
+        ).fetchall()
+        histograms = {}
+        for stage, key, latency_bin, count in conn.execute(
+            f"""
+            SELECT stage, {group_by}, bin, SUM(transitions)
+            FROM workflow_latency_histogram WHERE {where}
+            GROUP BY stage, {group_by}, bin
+            ORDER BY stage, {group_by}, bin
+            """,
+            params
+        ):
+            histograms.setdefault((stage, key), []).append((latency_bin, count))
+    
+    row = row_type(("stage", group_by, "transitions", "avg_minutes", "p50_minutes",
+                    "p90_minutes", "p99_minutes", "max_minutes"))
+    return [
+        row(stage, key, transitions, total_seconds / transitions / 60,
+            *(approximate_percentile(histograms.get((stage, key), []), fraction, low, high) / 60
+              for fraction in (0.5, 0.9, 0.99)),
+            high / 60)
+        for stage, key, transitions, total_seconds, low, high in totals
+    ]
+
+# Drop hourly rollup buckets past the retention period (daily buckets are kept)
+def prune_workflow_rollups(retention_days=WORKFLOW_HOURLY_RETENTION_DAYS):
+    cutoff = workflow_bucket("hour", datetime.datetime.now() - datetime.timedelta(days=retention_days))
+    with app_transaction() as conn:
+        pruned = conn.execute(
+            "DELETE FROM workflow_rollups WHERE granularity = 'hour' AND bucket_start < ?", (cutoff,)
+        ).rowcount
+        conn.execute(
+            "DELETE FROM workflow_latency_histogram WHERE granularity = 'hour' AND bucket_start < ?", (cutoff,)
+        )
+    return pruned
+
+# Function to hash passwords
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# Function to authenticate users
+@timed("db.authenticate")
+def authenticate(username, password):
+    with app_db() as conn:
+        user = conn.execute(
+            "SELECT username, role FROM users WHERE username = ? AND password_hash = ?", 
+            (username, hash_password(password))
+        ).fetchone()
+    
+    if user:
+        return True, user[0], user[1]
+    return False, None, None
+
+# Insert new requests (request_id, requestor, dml_statement, target_db, target_schema,
+# created_date) in the caller's transaction
+def insert_dml_requests(conn, rows):
+    conn.executemany(
+        """
+        INSERT INTO dml_requests 
+        (request_id, requestor, dml_statement, target_db, target_schema, status, created_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(request_id, requestor, dml_statement, target_db, target_schema,
+          STATUS_PENDING_MANAGER, created_date)
+         for request_id, requestor, dml_statement, target_db, target_schema, created_date in rows]
+    )
+    index_request_statements(conn, [(row[0], row[2]) for row in rows])
+    reuse_cached_dry_runs(conn, [row[0] for row in rows])
+    bump_data_version(conn)
+
+# Function to create a new DML request
+@timed("db.create_request")
+def create_dml_request(username, dml_statement, target_db, target_schema):
+    request_id = str(uuid.uuid4())
+    created_date = datetime.datetime.now()
+    
+    with app_transaction() as conn:
+        insert_dml_requests(
+            conn, [(request_id, username, dml_statement, target_db, target_schema, created_date)]
+        )
+    
+    return request_id
+
+# Function to create one request that rolls out to several environments. targets is a list of
+# (env_name, stage); in gated mode a stage only runs after every earlier stage succeeded,
+# otherwise all targets run concurrently.
+@timed("db.create_rollout_request")
+def create_rollout_request(username, dml_statement, targets, target_schema, gated=False):
+    request_id = str(uuid.uuid4())
+    created_date = datetime.datetime.now()
+    targets = sorted(targets, key=lambda target: target[1]) if gated else [(env, 0) for env, _ in targets]
+    
+    # The request row names the first target so it groups and filters with a real environment;
+    # the full list lives in request_targets. Dry runs don't apply, so drop any cached one.
+    with app_transaction() as conn:
+        insert_dml_requests(conn, [(
+            request_id, username, dml_statement, targets[0][0], target_schema, created_date
+        )])
+        conn.execute(
+            """
+            UPDATE dml_requests SET rollout_mode = ?, estimated_rows = NULL, plan_cost = NULL,
+                   dry_run_plan = NULL, dry_run_date = NULL
+            WHERE request_id = ?
+            """,
+            (ROLLOUT_GATED if gated else ROLLOUT_CONCURRENT, request_id)
+        )
+        conn.executemany(
+            "INSERT INTO request_targets (request_id, target_db, stage, status) VALUES (?, ?, ?, ?)",
+            [(request_id, env, stage, TARGET_PENDING) for env, stage in targets]
+        )
+    
+    return request_id
+
+# Function to get the per-environment state of a rollout request
+def get_request_targets(request_id):
+    with app_db() as conn:
+        return pd.read_sql_query(
+            """
+            SELECT target_db, stage, status, execution_date, rows_affected, execution_result
+            FROM request_targets WHERE request_id = ? ORDER BY stage, target_db
+            """,
+            conn, params=(request_id,)
+        )
+
+# Read requests from a SQL file: one request per block, blocks separated by a line
+# holding only the delimiter (e.g. GO). Yields dicts with the block's first line number.
+def iter_sql_file_requests(lines, target_db, target_schema, delimiter="GO"):
+    block = []
+    block_start = 1
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip().upper() == delimiter.upper():
+            if "".join(block).strip():
+                yield {"line": block_start, "dml_statement": "".join(block).strip(),
+                       "target_db": target_db, "target_schema": target_schema}
+            block = []
+            block_start = line_number + 1
+        else:
+            block.append(line)
+    
+    if "".join(block).strip():
+        yield {"line": block_start, "dml_statement": "".join(block).strip(),
+               "target_db": target_db, "target_schema": target_schema}
+
+# Read requests from a CSV file with statement, target_db and target_schema columns
+def iter_csv_requests(lines):
+    reader = csv.DictReader(lines)
+    missing = {"statement", "target_db", "target_schema"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+    
+    for row in reader:
+        yield {"line": reader.line_num, "dml_statement": (row["statement"] or "").strip(),
+               "target_db": (row["target_db"] or "").strip(),
+               "target_schema": (row["target_schema"] or "").strip()}
+
+# Split import rows into valid ones (yielded) and rejected ones, counted in summary["rejected"]
+# with only the first IMPORT_MAX_ERRORS kept in summary["errors"]
+def validate_import_rows(rows, valid_dbs, summary):
+    errors = summary["errors"]
+    for row in rows:
+        if not row["dml_statement"]:
+            error = "DML statement cannot be empty"
+        elif row["target_db"] not in valid_dbs:
+            error = f"Unknown target database '{row['target_db']}'"
+        elif not row["target_schema"]:
+            error = "Target schema cannot be empty"
+        else:
+            yield row
+            continue
+        summary["rejected"] += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append((row["line"], error))
+
+# Group an iterable into lists of at most size items
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+# Function to create many DML requests from an import stream, one transaction per batch.
+# Memory is bounded by the batch size and IMPORT_MAX_ERRORS; on_batch(imported_so_far)
+# reports progress.
+@timed("db.import_requests")
+def import_dml_requests(username, rows, valid_dbs, batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    summary = {"imported": 0, "rejected": 0, "errors": []}
+    
+    for batch in batched(validate_import_rows(rows, set(valid_dbs), summary), batch_size):
+        created_date = datetime.datetime.now()
+        with app_transaction() as conn:
+            insert_dml_requests(conn, [
+                (str(uuid.uuid4()), username, row["dml_statement"], row["target_db"],
+                 row["target_schema"], created_date)
+                for row in batch
+            ])
+        summary["imported"] += len(batch)
+        if on_batch:
+            on_batch(summary["imported"])
+    
+    return summary
+
+# Function to get pending requests for a manager
+@timed("db.pending_manager")
+@versioned_query
+def get_pending_manager_requests(cursor=None, page_size=PAGE_SIZE, table=None, operation=None):
+    where, params = queue_filter(STATUS_PENDING_MANAGER, table, operation)
+    return fetch_request_page(where, params, "created_date", cursor=cursor, page_size=page_size)
+
+# Function to get pending requests for production support
+@timed("db.pending_prod")
+@versioned_query
+def get_pending_prod_requests(cursor=None, page_size=PAGE_SIZE, table=None, operation=None):
+    where, params = queue_filter(STATUS_PENDING_PROD, table, operation)
+    return fetch_request_page(where, params, "created_date", cursor=cursor, page_size=page_size)
+
+# Function to get requests approved and waiting for execution
+@timed("db.approved")
+@versioned_query
+def get_approved_requests(cursor=None, page_size=PAGE_SIZE, table=None, operation=None):
+    where, params = queue_filter(STATUS_APPROVED, table, operation)
+    return fetch_request_page(where, params, "created_date", cursor=cursor, page_size=page_size)
+
+# Function to get the decisions made by a manager
+@timed("db.manager_decisions")
+def get_manager_decisions(manager_username, cursor=None, page_size=PAGE_SIZE):
+    return fetch_history_page(
+        "manager_username = ?", (manager_username,), "manager_action_date",
+        cursor=cursor, page_size=page_size, extra_columns=", manager_comments"
+    )
+
+# Function to get one full request (statement, comments, result) as a RequestRecord
+@timed("db.request_details")
+def get_request(request_id):
+    columns = ", ".join(REQUEST_FIELDS)
+    with app_db() as conn:
+        row = conn.execute(
+            f"SELECT {columns} FROM dml_requests WHERE request_id = ?", (request_id,)
+        ).fetchone()
+        if row is not None:
+            return RequestRecord._make(row)
+        
+        # Fall back to the archive
+        row = conn.execute(
+            f"SELECT {columns} FROM dml_requests_archive WHERE request_id = ?", (request_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return RequestRecord._make(decompress_text(value) for value in row)
+
+# Function to get the configured target databases
+def get_db_connections():
+    with app_db() as conn:
+        return fetch_rows(conn, "SELECT env_name, description FROM db_connections")
+
+# Apply one reviewer decision to many requests in a single transaction. Only rows still in
+# expected_status are updated; the rest are returned as {request_id: current status}.
+@timed("db.decision")
+def apply_bulk_decision(request_ids, expected_status, new_status, reviewer_columns,
+                        username, comments):
+    user_column, comments_column, date_column = reviewer_columns
+    action_date = datetime.datetime.now()
+    request_ids = list(dict.fromkeys(request_ids))
+    
+    with app_transaction() as conn:
+        # Each UPDATE is a compare-and-set on the status, so whichever reviewer (or replica)
+        # commits first wins and the other sees the row as already processed
+        eligible = [
+            request_id for request_id in request_ids
+            if conn.execute(
+                f"""
+                UPDATE dml_requests 
+                SET status = ?, {user_column} = ?, {comments_column} = ?, {date_column} = ?
+                WHERE request_id = ? AND status = ?
+                """,
+                (new_status, username, comments, action_date, request_id, expected_status)
+            ).rowcount
+        ]
+        if eligible:
+            bump_data_version(conn)
+        
+        updated = set(eligible)
+        missed = [request_id for request_id in request_ids if request_id not in updated]
+        current = {}
+        for start in range(0, len(missed), 500):
+            chunk = missed[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            current.update(conn.execute(
+                f"SELECT request_id, status FROM dml_requests WHERE request_id IN ({placeholders})",
+                chunk
+            ).fetchall())
+        skipped = {request_id: current.get(request_id, "Not found") for request_id in missed}
+    
+    return eligible, skipped
+
+# Function to record a manager decision on many requests at once
+def bulk_manager_decision(request_ids, manager_username, approved, comments):
+    return apply_bulk_decision(
+        request_ids, STATUS_PENDING_MANAGER,
+        STATUS_PENDING_PROD if approved else STATUS_REJECTED_MANAGER,
+        ("manager_username", "manager_comments", "manager_action_date"),
+        manager_username, comments
+    )
+
+# Function to record a production support decision on many requests at once
+def bulk_prod_support_decision(request_ids, support_username, approved, comments):
+    return apply_bulk_decision(
+        request_ids, STATUS_PENDING_PROD,
+        STATUS_APPROVED if approved else STATUS_REJECTED_PROD,
+        ("support_username", "support_comments", "support_action_date"),
+        support_username, comments
+    )
+
+# Function to update request status by manager; False if the request was already processed
+def update_manager_decision(request_id, manager_username, approved, comments):
+    updated, _ = bulk_manager_decision([request_id], manager_username, approved, comments)
+    return bool(updated)
+
+# Function to update request status by production support; False if the request was already processed
+def update_prod_support_decision(request_id, support_username, approved, comments):
+    updated, _ = bulk_prod_support_decision([request_id], support_username, approved, comments)
+    return bool(updated)
+
+# Split a DML script into individual statements on top-level semicolons, skipping over
+# quoted strings/identifiers, comments and PostgreSQL dollar-quoted bodies
+def split_sql_statements(script):
+    current = []
+    i = 0
+    length = len(script)
+    
+    while i < length:
+        char = script[i]
+        
+        if char in ("'", '"', "`"):
+            # Quoted literal or identifier; a doubled quote is an escaped quote
+            end = i + 1
+            while end < length:
+                if script[end] == char:
+                    if end + 1 < length and script[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(script[i:end + 1])
+            i = end + 1
+        elif script.startswith("--", i):
+            end = script.find("\n", i)
+            end = length if end == -1 else end
+            current.append(script[i:end])
+            i = end
+        elif script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            current.append(script[i:end])
+            i = end
+        elif char == "$":
+            # $tag$ ... $tag$ (tag may be empty)
+            tag_end = script.find("$", i + 1)
+            tag = script[i:tag_end + 1] if tag_end != -1 else ""
+            if tag and (tag == "$$" or tag[1:-1].replace("_", "").isalnum()):
+                end = script.find(tag, tag_end + 1)
+                end = length if end == -1 else end + len(tag)
+                current.append(script[i:end])
+                i = end
+            else:
+                current.append(char)
+                i += 1
+        elif char == ";":
+            statement = "".join(current).strip()
+            if statement:
+                yield statement
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    
+    statement = "".join(current).strip()
+    if statement:
+        yield statement
+
+# Statement kinds recognised by the analyzer, for filtering queues by operation
+SQL_OPERATIONS = ("INSERT", "UPDATE", "DELETE", "MERGE", "SELECT", "CREATE", "ALTER", "DROP", "TRUNCATE")
+
+# Keywords after which the next identifier names a table
+TABLE_KEYWORDS = {"update", "into", "from", "join", "table", "using", "truncate"}
+
+# Words that can sit between such a keyword and the table name
+TABLE_NAME_SKIP = {"only", "if", "not", "exists", "table", "lateral"}
+
+# Keywords that can follow such a keyword where no table is named (MERGE ... THEN UPDATE SET)
+TABLE_NAME_STOP = {"set", "select", "values", "default", "where", "on"}
+
+SQL_TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<string>'(?:[^']|'')*(?:'|$))
+  | (?P<dollar>\$(?P<tag>\w*)\$.*?(?:\$(?P=tag)\$|$))
+  | (?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+  | (?P<word>[^\W\d]\w*|\$\d+|[:@]\w+)
+  | (?P<symbol>.)
+""", re.VERBOSE | re.DOTALL)
+
+# Tokens of one statement as (kind, text): literals become "?", words are lowercased,
+# quoted identifiers are unquoted, comments and whitespace are dropped
+def sql_tokens(statement):
+    for match in SQL_TOKEN_PATTERN.finditer(statement):
+        kind = match.lastgroup if match.lastgroup != "tag" else "dollar"
+        if kind in ("space", "comment"):
+            continue
+        if kind in ("string", "dollar", "number"):
+            yield "literal", "?"
+        elif kind == "quoted":
+            yield "word", match.group()[1:-1]
+        elif kind == "word":
+            yield "word", match.group().lower()
+        else:
+            yield "symbol", match.group()
+
+# Normalize one statement to its literal-free shape, plus its operation and tables
+def analyze_sql_statement(statement):
+    tokens = list(sql_tokens(statement))
+    words = [text for kind, text in tokens if kind == "word"]
+    
+    # CTE names aren't tables; the operation of a WITH statement is its main verb
+    cte_names = set()
+    operation = words[0].upper() if words else ""
+    if operation == "WITH":
+        depth = 0
+        operation = ""
+        for index, (kind, text) in enumerate(tokens):
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+            elif kind == "word" and depth == 0:
+                if text == "as" and index > 0 and tokens[index - 1][0] == "word":
+                    cte_names.add(tokens[index - 1][1])
+                elif text.upper() in SQL_OPERATIONS:
+                    operation = text.upper()
+                    break
+    
+    tables = set()
+    for index, (kind, text) in enumerate(tokens):
+        if kind != "word" or text not in TABLE_KEYWORDS:
+            continue
+        position = index + 1
+        while position < len(tokens) and tokens[position][1] in TABLE_NAME_SKIP:
+            position += 1
+        if position >= len(tokens) or tokens[position][0] != "word":
+            continue
+        name = tokens[position][1]
+        # schema.table
+        while position + 2 < len(tokens) and tokens[position + 1][1] == "." and tokens[position + 2][0] == "word":
+            position += 2
+            name += "." + tokens[position][1]
+        if name not in cte_names and name not in TABLE_NAME_STOP and name.upper() not in SQL_OPERATIONS:
+            tables.add(name)
+    
+    normalized = " ".join(text for _, text in tokens)
+    # IN (?, ?, ?) and multi-row VALUES lists differ only in length
+    normalized = re.sub(r"\? (?:, \? )+", "? ", normalized + " ").strip()
+    normalized = re.sub(r"(\([^()]*\))(?: , \1)+", r"\1", normalized)
+    return normalized, operation, tables
+
+# Analysis of a whole script: fingerprint of its normalized statements, operations and tables.
+# Repeat lookups go through the statement_analysis index (see get_statement_analysis).
+def analyze_sql(dml_statement):
+    normalized, operations, tables = [], set(), set()
+    for statement in split_sql_statements(dml_statement):
+        statement_normalized, operation, statement_tables = analyze_sql_statement(statement)
+        normalized.append(statement_normalized)
+        if operation:
+            operations.add(operation)
+        tables |= statement_tables
+    normalized = ";\n".join(normalized)
+    return {
+        "fingerprint": hashlib.sha256(normalized.encode()).hexdigest(),
+        "normalized": normalized,
+        "operations": sorted(operations),
+        "tables": sorted(tables),
+    }
+
+# Analysis of a statement, read from the statement_analysis index by statement hash and
+# computed (and stored) on a miss, in the caller's transaction
+def get_statement_analysis(conn, dml_statement):
+    key = statement_hash(dml_statement)
+    row = conn.execute(
+        "SELECT fingerprint, normalized, operations, tables FROM statement_analysis WHERE statement_hash = ?",
+        (key,)
+    ).fetchone()
+    if row is not None:
+        return key, {
+            "fingerprint": row[0], "normalized": row[1],
+            "operations": json.loads(row[2]), "tables": json.loads(row[3]),
+        }
+    
+    analysis = analyze_sql(dml_statement)
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO statement_analysis
+        (statement_hash, fingerprint, normalized, operations, tables, analyzed_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (key, analysis["fingerprint"], analysis["normalized"], json.dumps(analysis["operations"]),
+         json.dumps(analysis["tables"]), datetime.datetime.now())
+    )
+    return key, analysis
+
+# Fingerprint requests (request_id, dml_statement) and index the tables and operations they touch
+def index_request_statements(conn, requests):
+    for request_id, dml_statement in requests:
+        key, analysis = get_statement_analysis(conn, dml_statement)
+        conn.execute(
+            "UPDATE dml_requests SET statement_hash = ?, fingerprint = ? WHERE request_id = ?",
+            (key, analysis["fingerprint"], request_id)
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO request_tables (table_name, request_id) VALUES (?, ?)",
+            [(table, request_id) for table in analysis["tables"]]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO request_operations (operation, request_id) VALUES (?, ?)",
+            [(operation, request_id) for operation in analysis["operations"]]
+        )
+
+# Give new requests the still-fresh dry-run estimate of an identical statement on the same target
+def reuse_cached_dry_runs(conn, request_ids):
+    cutoff = datetime.datetime.now() - datetime.timedelta(seconds=DRY_RUN_CACHE_TTL)
+    for batch in batched(request_ids, 500):
+        conn.execute(
+            f"""
+            UPDATE dml_requests
+            SET estimated_rows = c.estimated_rows, plan_cost = c.plan_cost,
+                dry_run_plan = c.plan, dry_run_date = c.created_date
+            FROM dry_run_cache c
+            WHERE dml_requests.request_id IN ({", ".join("?" * len(batch))})
+              AND c.statement_hash = dml_requests.statement_hash
+              AND c.target_db = dml_requests.target_db
+              AND c.target_schema = dml_requests.target_schema
+              AND c.created_date >= ?
+            """,
+            tuple(batch) + (cutoff,)
+        )
+
+# Function to get other requests, active or archived, with the same statement fingerprint
+def get_similar_requests(request_id, limit=SIMILAR_REQUESTS_LIMIT):
+    columns = """
+        request_id, requestor, target_db, status, created_date, manager_username,
+        manager_comments, support_comments, statement_hash = ? AS exact_match
+    """
+    with app_db() as conn:
+        row = conn.execute(
+            """
+            SELECT fingerprint, statement_hash FROM dml_requests WHERE request_id = ?
+            UNION ALL
+            SELECT fingerprint, statement_hash FROM dml_requests_archive WHERE request_id = ?
+            """,
+            (request_id, request_id)
+        ).fetchone()
+        if row is None or row[0] is None:
+            return []
+        return fetch_rows(
+            conn,
+            f"""
+            SELECT * FROM (
+                SELECT {columns} FROM dml_requests WHERE fingerprint = ? AND request_id != ?
+                UNION ALL
+                SELECT {columns} FROM dml_requests_archive WHERE fingerprint = ? AND request_id != ?
+            )
+            ORDER BY created_date DESC LIMIT ?
+            """,
+            (row[1], row[0], request_id, row[1], row[0], request_id, limit)
+        )
+
+# Queue filter for a status, optionally narrowed to requests touching a table or running
+# an operation
+def queue_filter(status, table=None, operation=None):
+    where, params = "status = ?", (status,)
+    if table:
+        where += " AND request_id IN (SELECT request_id FROM request_tables WHERE table_name = ?)"
+        params += (table.strip().lower(),)
+    if operation:
+        where += " AND request_id IN (SELECT request_id FROM request_operations WHERE operation = ?)"
+        params += (operation,)
+    return where, params
+
+# Switch a target connection to the request's schema (SQLite targets have no USE)
+def set_target_schema(db_conn, target_schema):
+    if target_schema and db_conn.dialect.name != "sqlite":
+        db_conn.exec_driver_sql(f"USE {target_schema}")
+
+# Record a committed batch and the running totals for the request
+def _record_checkpoint(request_id, batch_index, first_statement, statement_count, rows_affected):
+    with app_transaction() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO execution_checkpoints
+            (request_id, batch_index, first_statement, statement_count, rows_affected, committed_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (request_id, batch_index, first_statement, statement_count, rows_affected,
+             datetime.datetime.now())
+        )
+        conn.execute(
+            """
+            UPDATE dml_requests
+            SET statements_executed = ?, rows_affected = COALESCE(rows_affected, 0) + ?
+            WHERE request_id = ?
+            """,
+            (first_statement + statement_count, rows_affected, request_id)
+        )
+
+# Function to execute approved DML in batches of statements, committing after each batch.
+# on_connect receives the target connection once it is open, should_stop is checked between
+# batches, and resume=True continues after the last checkpointed batch instead of starting over.
+# db_conn runs a single-target request on an already open target connection.
+@timed("execute.total")
+def execute_dml_request(request_id, on_connect=None, should_stop=None, resume=False,
+                        batch_size=EXECUTION_BATCH_SIZE, env_slot=None, db_conn=None):
+    with app_db() as conn:
+        # Get the request details
+        request = conn.execute(
+            """
+            SELECT dml_statement, target_db, target_schema, rollout_mode FROM dml_requests
+            WHERE request_id = ?
+            """, 
+            (request_id,)
+        ).fetchone()
+        
+        if not request:
+            return False, "Request not found"
+        
+        dml_statement, target_db, target_schema, rollout_mode = request
+        
+        if rollout_mode:
+            return execute_rollout(request_id, on_connect, should_stop, resume, env_slot)
+        
+        # Get connection string
+        connection_result = conn.execute(
+            "SELECT connection_string FROM db_connections WHERE env_name = ?", 
+            (target_db,)
+        ).fetchone()
+        
+        last_checkpoint = conn.execute(
+            """
+            SELECT batch_index, first_statement + statement_count FROM execution_checkpoints
+            WHERE request_id = ? ORDER BY batch_index DESC LIMIT 1
+            """,
+            (request_id,)
+        ).fetchone()
+    
+    if not connection_result:
+        return False, f"No connection configuration found for {target_db}"
+    
+    connection_string = connection_result[0]
+    statements = list(split_sql_statements(dml_statement))
+    
+    # Start after the last checkpointed statement, or wipe old checkpoints for a fresh run
+    next_batch = next_statement = 0
+    if resume and last_checkpoint is not None:
+        next_batch, next_statement = last_checkpoint[0] + 1, last_checkpoint[1]
+    else:
+        with app_transaction() as conn:
+            conn.execute("DELETE FROM execution_checkpoints WHERE request_id = ?", (request_id,))
+            conn.execute(
+                """
+                UPDATE dml_requests SET statement_count = ?, statements_executed = 0, rows_affected = 0
+                WHERE request_id = ?
+                """,
+                (len(statements), request_id)
+            )
+    
+    total_batches = next_batch + -(-(len(statements) - next_statement) // batch_size)
+    
+    # Execute the DML on a pooled connection (no app DB lock is held meanwhile). A crash between
+    # a batch's commit on the target and its checkpoint means that batch runs again on resume.
+    if db_conn is not None:
+        connection = nullcontext(db_conn)
+    else:
+        connection = get_engine_registry().connect(target_db, connection_string)
+    
+    try:
+        with connection as db_conn:
+            if on_connect:
+                on_connect(db_conn)
+            
+            use_schema = bool(target_schema)
+            for first_statement in range(next_statement, len(statements), batch_size):
+                if should_stop and should_stop():
+                    raise RuntimeError("Execution stopped")
+                
+                batch = statements[first_statement:first_statement + batch_size]
+                batch_rows = 0
+                with db_conn.begin():
+                    # Set schema if needed (it sticks to the session after the first batch)
+                    if use_schema:
+                        with stage_timer("target.use_schema", target_db):
+                            set_target_schema(db_conn, target_schema)
+                        use_schema = False
+                    
+                    with stage_timer("target.statements", target_db):
+                        for statement in batch:
+                            result = db_conn.exec_driver_sql(statement)
+                            batch_rows += max(result.rowcount, 0)
+                
+                with stage_timer("execute.checkpoint", target_db):
+                    _record_checkpoint(request_id, next_batch, first_statement, len(batch), batch_rows)
+                next_batch += 1
+                next_statement = first_statement + len(batch)
+        
+        execution_date = datetime.datetime.now()
+        execution_result = f"Success: {len(statements)} statement(s) in {total_batches} batch(es)"
+        status = STATUS_EXECUTED
+    except Exception as e:
+        execution_date = datetime.datetime.now()
+        execution_result = (
+            f"Batch {next_batch + 1} of {total_batches} failed and was rolled back; "
+            f"{next_statement} of {len(statements)} statement(s) are committed. {e}"
+        )
+        status = STATUS_FAILED
+    
+    # Update the request status
+    with stage_timer("execute.status_update", target_db), app_transaction() as conn:
+        conn.execute(
+            """
+            UPDATE dml_requests 
+            SET status = ?, execution_date = ?, execution_result = ?
+            WHERE request_id = ? AND status IN (?, ?)
+            """,
+            (status, execution_date, execution_result, request_id, STATUS_APPROVED, STATUS_EXECUTING)
+        )
+        bump_data_version(conn)
+    
+    return status == STATUS_EXECUTED, execution_result
+
+# Run a whole script on one rollout target in a single transaction and record the outcome
+def _execute_rollout_target(request_id, target_db, statements, target_schema, on_connect, env_slot):
+    with app_transaction() as conn:
+        conn.execute(
+            "UPDATE request_targets SET status = ? WHERE request_id = ? AND target_db = ?",
+            (STATUS_EXECUTING, request_id, target_db)
+        )
+        connection_result = conn.execute(
+            "SELECT connection_string FROM db_connections WHERE env_name = ?", (target_db,)
+        ).fetchone()
+    
+    rows_affected = 0
+    try:
+        if not connection_result:
+            raise ValueError(f"No connection configuration found for {target_db}")
+        
+        slot = env_slot(target_db)
+        slot.acquire()
+        try:
+            with get_engine_registry().connect(target_db, connection_result[0]) as db_conn:
+                if on_connect:
+                    on_connect(db_conn)
+                with db_conn.begin():
+                    with stage_timer("target.use_schema", target_db):
+                        set_target_schema(db_conn, target_schema)
+                    with stage_timer("target.statements", target_db):
+                        for statement in statements:
+                            rows_affected += max(db_conn.exec_driver_sql(statement).rowcount, 0)
+        finally:
+            slot.release()
+        status, result = STATUS_EXECUTED, "Success"
+    except Exception as e:
+        status, result = STATUS_FAILED, str(e)
+    
+    with app_transaction() as conn:
+        conn.execute(
+            """
+            UPDATE request_targets SET status = ?, execution_date = ?, execution_result = ?, rows_affected = ?
+            WHERE request_id = ? AND target_db = ?
+            """,
+            (status, datetime.datetime.now(), result, rows_affected, request_id, target_db)
+        )
+    return status == STATUS_EXECUTED
+
+# Function to execute a rollout request: each stage's targets run concurrently, and in gated
+# mode a failed stage skips the remaining ones. resume=True leaves executed targets alone.
+# Each target waits for its own environment slot (env_slot(target_db), the shared ones by default).
+def execute_rollout(request_id, on_connect=None, should_stop=None, resume=False, env_slot=None):
+    env_slot = env_slot or get_env_slots().slot
+    with app_db() as conn:
+        dml_statement, target_schema, rollout_mode = conn.execute(
+            "SELECT dml_statement, target_schema, rollout_mode FROM dml_requests WHERE request_id = ?",
+            (request_id,)
+        ).fetchone()
+        targets = conn.execute(
+            "SELECT target_db, stage, status FROM request_targets WHERE request_id = ? ORDER BY stage",
+            (request_id,)
+        ).fetchall()
+    
+    statements = list(split_sql_statements(dml_statement))
+    pending = [(env, stage) for env, stage, status in targets if not (resume and status == STATUS_EXECUTED)]
+    
+    with app_transaction() as conn:
+        conn.executemany(
+            """
+            UPDATE request_targets SET status = ?, execution_date = NULL, execution_result = NULL,
+                   rows_affected = NULL
+            WHERE request_id = ? AND target_db = ?
+            """,
+            [(TARGET_PENDING, request_id, env) for env, _ in pending]
+        )
+    
+    stages = {}
+    for env, stage in pending:
+        stages.setdefault(stage, []).append(env)
+    
+    failed = []
+    for stage in sorted(stages):
+        if failed and rollout_mode == ROLLOUT_GATED:
+            break
+        if should_stop and should_stop():
+            failed.append("stopped")
+            break
+        
+        envs = stages[stage]
+        with ThreadPoolExecutor(max_workers=len(envs), thread_name_prefix="dml-rollout") as pool:
+            outcomes = pool.map(
+                lambda env: _execute_rollout_target(
+                    request_id, env, statements, target_schema, on_connect, env_slot
+                ),
+                envs
+            )
+            failed.extend(env for env, succeeded in zip(envs, list(outcomes)) if not succeeded)
+    
+    with app_transaction() as conn:
+        conn.execute(
+            """
+            UPDATE request_targets SET status = ?, execution_result = ?
+            WHERE request_id = ? AND status = ?
+            """,
+            (TARGET_SKIPPED, "Skipped because an earlier stage did not succeed", request_id, TARGET_PENDING)
+        )
+        outcome = conn.execute(
+            "SELECT target_db, status FROM request_targets WHERE request_id = ? ORDER BY stage, target_db",
+            (request_id,)
+        ).fetchall()
+        
+        status = STATUS_EXECUTED if all(row[1] == STATUS_EXECUTED for row in outcome) else STATUS_FAILED
+        execution_result = "; ".join(f"{env}: {target_status}" for env, target_status in outcome)
+        conn.execute(
+            """
+            UPDATE dml_requests 
+            SET status = ?, execution_date = ?, execution_result = ?
+            WHERE request_id = ? AND status IN (?, ?)
+            """,
+            (status, datetime.datetime.now(), execution_result, request_id, STATUS_APPROVED, STATUS_EXECUTING)
+        )
+        bump_data_version(conn)
+    
+    return status == STATUS_EXECUTED, execution_result
+
+# Hash identifying a statement text in caches
+def statement_hash(dml_statement):
+    return hashlib.sha256(dml_statement.encode()).hexdigest()
+
+# Statements safe to run inside a rolled-back transaction (DDL would auto-commit on some targets)
+DRY_RUN_EXECUTABLE = ("INSERT", "UPDATE", "DELETE", "MERGE")
+
+# Ask the target for a plan; returns (cost or None, plan text)
+def explain_statement(db_conn, statement):
+    dialect = db_conn.dialect.name
+    
+    if dialect == "postgresql":
+        plan = db_conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}").scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return plan[0]["Plan"].get("Total Cost"), json.dumps(plan[0]["Plan"], indent=1)
+    if dialect in ("mysql", "mariadb"):
+        plan = json.loads(db_conn.exec_driver_sql(f"EXPLAIN FORMAT=JSON {statement}").scalar())
+        cost = plan.get("query_block", {}).get("cost_info", {}).get("query_cost")
+        return (float(cost) if cost is not None else None), json.dumps(plan, indent=1)
+    if dialect == "sqlite":
+        rows = db_conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+        return None, "\n".join(str(row[-1]) for row in rows)
+    return None, f"EXPLAIN is not supported for {dialect} targets"
+
+# Plan every statement and, in rollback mode, execute DML inside a transaction that is always
+# rolled back to count the rows it would touch. The row estimate is None when some DML's
+# count isn't reported by the driver.
+def dry_run_statements(db_conn, statements, target_schema, mode=DRY_RUN_MODE):
+    estimated_rows = 0
+    total_cost = None
+    plans = []
+    
+    transaction = db_conn.begin()
+    try:
+        set_target_schema(db_conn, target_schema)
+        for number, statement in enumerate(statements, start=1):
+            cost, plan = explain_statement(db_conn, statement)
+            if cost is not None:
+                total_cost = (total_cost or 0) + cost
+            plans.append(f"-- Statement {number}\n{plan}")
+            
+            # Classify on the comment-stripped tokens (WITH resolves to its main verb)
+            if mode == "rollback" and analyze_sql_statement(statement)[1] in DRY_RUN_EXECUTABLE:
+                rowcount = db_conn.exec_driver_sql(statement).rowcount
+                if (rowcount is None or rowcount < 0) and db_conn.dialect.name == "sqlite":
+                    # pysqlite reports no rowcount for WITH-led DML; SQLite itself still knows
+                    rowcount = db_conn.exec_driver_sql("SELECT changes()").scalar()
+                if rowcount is None or rowcount < 0 or estimated_rows is None:
+                    estimated_rows = None
+                else:
+                    estimated_rows += rowcount
+    finally:
+        transaction.rollback()
+    
+    return {
+        "estimated_rows": estimated_rows if mode == "rollback" else None,
+        "plan_cost": total_cost,
+        "plan": "\n".join(plans),
+    }
+
+# Function to dry-run a request against its target and store the estimates on the request.
+# Results are cached by (statement hash, target_db, target_schema) for DML_DRY_RUN_CACHE_TTL.
+@timed("execute.dry_run")
+def dry_run_dml_request(request_id, force=False, mode=DRY_RUN_MODE):
+    with app_db() as conn:
+        request = conn.execute(
+            """
+            SELECT dml_statement, target_db, target_schema, rollout_mode FROM dml_requests
+            WHERE request_id = ?
+            """,
+            (request_id,)
+        ).fetchone()
+        if not request:
+            return None, "Request not found"
+        dml_statement, target_db, target_schema, rollout_mode = request
+        if rollout_mode:
+            # target_db lists every environment; there's no single target to estimate against
+            return None, "Dry runs aren't supported for multi-environment rollouts"
+        key = (statement_hash(dml_statement), target_db, target_schema)
+        
+        cached = conn.execute(
+            """
+            SELECT estimated_rows, plan_cost, plan, created_date FROM dry_run_cache
+            WHERE statement_hash = ? AND target_db = ? AND target_schema = ?
+            """,
+            key
+        ).fetchone()
+        connection_result = conn.execute(
+            "SELECT connection_string FROM db_connections WHERE env_name = ?", (target_db,)
+        ).fetchone()
+    
+    now = datetime.datetime.now()
+    fresh = cached is not None and (
+        now - datetime.datetime.fromisoformat(str(cached[3]))
+    ).total_seconds() < DRY_RUN_CACHE_TTL
+    
+    if fresh and not force:
+        estimate = {"estimated_rows": cached[0], "plan_cost": cached[1], "plan": cached[2]}
+        dry_run_date = cached[3]
+    else:
+        if not connection_result:
+            return None, f"No connection configuration found for {target_db}"
+        
+        try:
+            with get_engine_registry().connect(target_db, connection_result[0]) as db_conn:
+                # Don't let a runaway estimate hold locks on the target for long
+                timer = threading.Timer(
+                    DRY_RUN_TIMEOUT, interrupt_db_connection, (get_dbapi_connection(db_conn),)
+                )
+                timer.daemon = True
+                timer.start()
+                try:
+                    estimate = dry_run_statements(
+                        db_conn, list(split_sql_statements(dml_statement)), target_schema, mode
+                    )
+                finally:
+                    timer.cancel()
+        except Exception as e:
+            return None, f"Dry run failed: {e}"
+        
+        dry_run_date = now
+        with app_transaction() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO dry_run_cache
+                (statement_hash, target_db, target_schema, estimated_rows, plan_cost, plan, created_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                key + (estimate["estimated_rows"], estimate["plan_cost"], estimate["plan"], now)
+            )
+    
+    with app_transaction() as conn:
+        conn.execute(
+            """
+            UPDATE dml_requests
+            SET estimated_rows = ?, plan_cost = ?, dry_run_plan = ?, dry_run_date = ?
+            WHERE request_id = ?
+            """,
+            (estimate["estimated_rows"], estimate["plan_cost"], estimate["plan"], dry_run_date,
+             request_id)
+        )
+        bump_data_version(conn)
+    
+    return estimate, None
+
+# Terminal statuses eligible for archival
+ARCHIVABLE_STATUSES = (STATUS_REJECTED_MANAGER, STATUS_REJECTED_PROD, STATUS_EXECUTED, STATUS_FAILED)
+
+# Columns holding potentially large text, compressed in the archive
+ARCHIVE_COMPRESSED_COLUMNS = ("dml_statement", "execution_result", "dry_run_plan")
+
+# Compress a large text value for the archive; short values stay plain TEXT
+def compress_text(value):
+    if value is None or len(value) < ARCHIVE_COMPRESS_MIN_CHARS:
+        return value
+    return zlib.compress(value.encode(), 6)
+
+# Undo compress_text; archived BLOBs are always compressed text
+def decompress_text(value):
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode()
+    return value
+
+# Move terminal requests created more than retention_days ago into dml_requests_archive,
+# one batch per transaction. Returns the number of requests archived.
+@timed("maintenance.archive")
+def archive_terminal_requests(retention_days=ARCHIVE_RETENTION_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+    placeholders = ", ".join("?" * len(ARCHIVABLE_STATUSES))
+    archived = 0
+    
+    with app_db() as conn:
+        # Copy every column both tables share, so later columns only need adding to each
+        archive_columns = {row[1] for row in conn.execute("PRAGMA table_info(dml_requests_archive)")}
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(dml_requests)")
+                   if row[1] in archive_columns]
+    column_list = ", ".join(columns)
+    
+    while True:
+        with app_transaction() as conn:
+            cursor = conn.execute(
+                f"""
+                SELECT {column_list} FROM dml_requests
+                WHERE status IN ({placeholders}) AND created_date < ?
+                LIMIT ?
+                """,
+                ARCHIVABLE_STATUSES + (cutoff, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            now = datetime.datetime.now()
+            statement_index = columns.index("dml_statement")
+            archive_rows = []
+            for row in rows:
+                values = [
+                    compress_text(value) if name in ARCHIVE_COMPRESSED_COLUMNS else value
+                    for name, value in zip(columns, row)
+                ]
+                statement = row[statement_index]
+                archive_rows.append(values + [statement[:STATEMENT_PREVIEW_CHARS], len(statement), now])
+            
+            conn.executemany(
+                f"""
+                INSERT OR REPLACE INTO dml_requests_archive
+                ({column_list}, statement_preview, statement_size, archived_date)
+                VALUES ({", ".join("?" * (len(columns) + 3))})
+                """,
+                archive_rows
+            )
+            request_ids = [(row[0],) for row in rows]
+            conn.executemany("DELETE FROM dml_requests WHERE request_id = ?", request_ids)
+            conn.executemany("DELETE FROM execution_checkpoints WHERE request_id = ?", request_ids)
+            bump_data_version(conn)
+        
+        archived += len(rows)
+    
+    return archived
+
+# Turn free text into an FTS5 query: every word must match, a trailing * matches a prefix
+def fts_query(text):
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+# Ranked full-text search over active and archived requests. Requestors pass their username
+# to only see their own requests. The cursor is the offset of the next page.
+@timed("db.search")
+@versioned_query
+def search_requests(text, requestor=None, cursor=None, page_size=PAGE_SIZE):
+    query = fts_query(text)
+    if not query:
+        return [], None
+    
+    offset = cursor or 0
+    sql = """
+        SELECT d.request_id,
+               snippet(request_search, -1, '**', '**', '...', 16) AS match,
+               bm25(request_search, 4.0, 2.0, 2.0, 1.0) AS score
+        FROM request_search
+        JOIN request_search_docs d ON d.doc_id = request_search.rowid
+        WHERE request_search MATCH ?
+    """
+    params = (query,)
+    
+    with app_db() as conn:
+        if requestor is not None:
+            sql += " AND d.requestor = ?"
+            params += (requestor,)
+        else:
+            # Documents are numbered in creation order, so a rowid floor keeps the newest matches
+            floor = conn.execute(
+                "SELECT rowid FROM request_search WHERE request_search MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                (query, SEARCH_MAX_CANDIDATES - 1)
+            ).fetchone()
+            if floor is not None:
+                sql += " AND request_search.rowid >= ?"
+                params += (floor[0],)
+        sql += " ORDER BY score LIMIT ? OFFSET ?"
+        params += (page_size + 1, offset)
+        
+        matches = conn.execute(sql, params).fetchall()
+        
+        next_cursor = None
+        if len(matches) > page_size:
+            matches = matches[:page_size]
+            next_cursor = offset + page_size
+        if not matches:
+            return [], next_cursor
+        
+        # Summaries come from whichever table holds each request now
+        request_ids = tuple(match[0] for match in matches)
+        placeholders = ", ".join("?" * len(request_ids))
+        summaries = fetch_rows(
+            conn,
+            f"SELECT {REQUEST_SUMMARY_COLUMNS} FROM dml_requests WHERE request_id IN ({placeholders})",
+            request_ids
+        ) + fetch_rows(
+            conn,
+            f"SELECT {ARCHIVE_SUMMARY_COLUMNS} FROM dml_requests_archive WHERE request_id IN ({placeholders})",
+            request_ids
+        )
+    
+    by_id = {summary.request_id: summary for summary in summaries}
+    make_row = row_type(summaries[0]._fields + ("match", "score"))._make if summaries else None
+    results = [
+        make_row(by_id[request_id] + (match, score))
+        for request_id, match, score in matches if request_id in by_id
+    ]
+    return results, next_cursor
+
+# Function to get user's request history
+@timed("db.user_requests")
+def get_user_requests(username, cursor=None, page_size=PAGE_SIZE):
+    return fetch_history_page(
+        "requestor = ?", (username,), "created_date", cursor=cursor, page_size=page_size
+    )
+
+# Columns of the audit export: the request with its approvals and results (not the dry-run
+# plan or fingerprints), plus whether it was read from the archive
+EXPORT_FIELDS = tuple(
+    field for field in REQUEST_FIELDS if field not in ("dry_run_plan", "statement_hash", "fingerprint")
+) + ("archived",)
+
+# Non-text export columns, typed in the Parquet schema
+EXPORT_COLUMN_TYPES = {
+    "statement_count": "int64",
+    "statements_executed": "int64",
+    "rows_affected": "int64",
+    "estimated_rows": "int64",
+    "plan_cost": "float64",
+    "archived": "bool_",
+}
+
+# Filter for the audit export: created in [start, end) with any of the statuses and environments
+def export_filter(start=None, end=None, statuses=(), target_dbs=()):
+    clauses, params = ["1 = 1"], ()
+    if start is not None:
+        clauses.append("created_date >= ?")
+        params += (start,)
+    if end is not None:
+        clauses.append("created_date < ?")
+        params += (end,)
+    if statuses:
+        clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+        params += tuple(statuses)
+    if target_dbs:
+        # Rollouts match on any of their targets
+        placeholders = ", ".join("?" * len(target_dbs))
+        clauses.append(
+            f"(target_db IN ({placeholders}) OR request_id IN "
+            f"(SELECT request_id FROM request_targets WHERE target_db IN ({placeholders})))"
+        )
+        params += tuple(target_dbs) * 2
+    return " AND ".join(clauses), params
+
+# Requests matching an export filter as lists of up to chunk_size tuples, active requests then
+# archived ones, each in (created_date, request_id) order. Every chunk is its own keyset query,
+# so no read transaction stays open across chunks and writers are never held up.
+def iter_export_chunks(where, params, chunk_size=EXPORT_CHUNK_SIZE):
+    columns = ", ".join(EXPORT_FIELDS[:-1])
+    compressed = [EXPORT_FIELDS.index(column) for column in ARCHIVE_COMPRESSED_COLUMNS if column in EXPORT_FIELDS]
+    
+    def unarchive(row):
+        row = list(row)
+        for index in compressed:
+            row[index] = decompress_text(row[index])
+        row.append(True)
+        return tuple(row)
+    
+    for table, archived in (("dml_requests", False), ("dml_requests_archive", True)):
+        cursor = None
+        while True:
+            rows, cursor = _finish_page(
+                _query_request_page(table, columns, where, params, "created_date", False, cursor, chunk_size),
+                "created_date", chunk_size
+            )
+            if rows and archived:
+                yield [unarchive(row) for row in rows]
+            elif rows:
+                yield [tuple(row) + (False,) for row in rows]
+            if cursor is None:
+                break
+
+# Writes export chunks to a CSV file with a header row
+class CsvExportWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXPORT_FIELDS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+# Writes export chunks to a Parquet file, one row group per chunk
+class ParquetExportWriter:
+    def __init__(self, path):
+        self._schema = pa.schema([
+            (field, getattr(pa, EXPORT_COLUMN_TYPES.get(field, "string"))()) for field in EXPORT_FIELDS
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), self._schema)]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+EXPORT_WRITERS = {"csv": CsvExportWriter, "parquet": ParquetExportWriter}
+
+# Stream every request matching an export filter to path, holding one chunk in memory at a time.
+# on_progress receives (rows written, rows matching) after each chunk. The file is written
+# under a temporary name and only appears at path once complete.
+@timed("export")
+def export_requests(path, export_format, where, params, chunk_size=EXPORT_CHUNK_SIZE, on_progress=None):
+    with app_db() as conn:
+        total = sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+            for table in ("dml_requests", "dml_requests_archive")
+        )
+    
+    partial = f"{path}.part"
+    writer = EXPORT_WRITERS[export_format](partial)
+    written = 0
+    try:
+        for chunk in iter_export_chunks(where, params, chunk_size):
+            writer.write(chunk)
+            written += len(chunk)
+            if on_progress:
+                on_progress(written, total)
+    except BaseException:
+        writer.close()
+        os.remove(partial)
+        raise
+    writer.close()
+    os.replace(partial, path)
+    return written
+
+# Delete page exports (and abandoned partial files) in EXPORT_DIR older than retention_hours
+def prune_exports(retention_hours=EXPORT_RETENTION_HOURS):
+    if not os.path.isdir(EXPORT_DIR):
+        return 0
+    cutoff = time.time() - retention_hours * 3600
+    pruned = 0
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.name.startswith("dml_requests_") and entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                # Another replica's archive job got there first
+                continue
+            pruned += 1
+    return pruned
+
+# Contents of a finished export, read only when its download button is clicked
+def read_export(path):
+    with open(path, "rb") as export_file:
+        return export_file.read()
+
+# Raw DBAPI connection behind a SQLAlchemy connection
+def get_dbapi_connection(db_conn):
+    return getattr(db_conn.connection, "dbapi_connection", None) or db_conn.connection
+
+# Best-effort cancellation of the statement running on a DBAPI connection (safe from other threads)
+def interrupt_db_connection(dbapi_conn):
+    for method in ("cancel", "interrupt"):
+        if hasattr(dbapi_conn, method):
+            getattr(dbapi_conn, method)()
+            return True
+    return False
+
+# Set a job's state (and any extra columns) in the caller's transaction
+def _update_job(conn, job_id, status, **fields):
+    assignments = ", ".join(["status = ?"] + [f"{name} = ?" for name in fields])
+    conn.execute(
+        f"UPDATE execution_jobs SET {assignments} WHERE job_id = ?",
+        (status, *fields.values(), job_id)
+    )
+
+# Per-target semaphores limiting how many executions run against one environment at a time
+class EnvSlots:
+    def __init__(self, concurrency):
+        self._concurrency = concurrency
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    def slot(self, target_db):
+        with self._lock:
+            if target_db not in self._slots:
+                self._slots[target_db] = threading.BoundedSemaphore(self._concurrency)
+            return self._slots[target_db]
+
+# Slot registry shared by the execution engine, grouped executions and the scheduler
+@st.cache_resource
+def get_env_slots():
+    return EnvSlots(EXECUTOR_ENV_CONCURRENCY)
+
+# Executions this process is running, by job id, with their target connections and stop state,
+# so a timeout or a cancel can interrupt them mid-statement
+class ExecutionWatch:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = {}
+
+    # Register the target connections of a running execution under its jobs, so interrupt()
+    # on any of them stops it; so does the timeout, which starts with the first connection
+    def _watcher(self, job_ids, state, timeout_seconds):
+        def on_connect(db_conn):
+            # Rollouts open one connection per target; the timeout covers the whole job
+            with self._lock:
+                dbapi_conns = self._running.setdefault(job_ids[0], ([], state))[0]
+                for job_id in job_ids[1:]:
+                    self._running[job_id] = (dbapi_conns, state)
+                dbapi_conns.append(get_dbapi_connection(db_conn))
+                if state["timer"] is None:
+                    state["timer"] = threading.Timer(timeout_seconds, self.interrupt, (job_ids[0], JOB_TIMED_OUT))
+                    state["timer"].daemon = True
+                    state["timer"].start()
+        return on_connect
+
+    def _unwatch(self, job_ids, state):
+        if state["timer"] is not None:
+            state["timer"].cancel()
+        with self._lock:
+            for job_id in job_ids:
+                self._running.pop(job_id, None)
+
+    # Stop check for running work: the reason interrupt() recorded, or a cancel requested on
+    # one of its jobs (job_ids may fill in later) through the app store, e.g. by another replica
+    def _stop_check(self, job_ids, state):
+        def should_stop():
+            if state["reason"] is None and job_ids and cancel_requested(job_ids):
+                state["reason"] = JOB_CANCELLED
+            return state["reason"]
+        return should_stop
+
+    def interrupt(self, job_id, reason):
+        with self._lock:
+            running = self._running.get(job_id)
+        if running is None:
+            return False
+        dbapi_conns, state = running
+        state["reason"] = reason
+        return any([interrupt_db_connection(dbapi_conn) for dbapi_conn in dbapi_conns])
+
+# Worker pool that runs approved requests in the background, a few per target environment
+class ExecutionEngine(ExecutionWatch):
+    def __init__(self, workers, env_slots):
+        super().__init__()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dml-executor")
+        self._env_slots = env_slots
+
+    def submit(self, job_id):
+        self._pool.submit(self._run, job_id)
+
+    def env_slot(self, target_db):
+        return self._env_slots.slot(target_db)
+
+    def _run(self, job_id):
+        with app_db() as conn:
+            job = conn.execute(
+                """
+                SELECT j.request_id, j.target_db, j.timeout_seconds, j.resume, r.rollout_mode
+                FROM execution_jobs j JOIN dml_requests r ON r.request_id = j.request_id
+                WHERE j.job_id = ? AND j.status = ?
+                """,
+                (job_id, JOB_QUEUED)
+            ).fetchone()
+        if job is None:
+            return
+        request_id, target_db, timeout_seconds, resume, rollout_mode = job
+        
+        # Don't hold a worker while the target is busy; try again shortly. Rollouts take
+        # a slot per target as they reach it instead.
+        slot = threading.BoundedSemaphore(1) if rollout_mode else self.env_slot(target_db)
+        if not slot.acquire(blocking=False):
+            threading.Timer(EXECUTOR_REQUEUE_DELAY, self.submit, (job_id,)).start()
+            return
+        
+        try:
+            # Claim the job; it may have been cancelled or picked up elsewhere meanwhile
+            with app_transaction() as conn:
+                now = datetime.datetime.now()
+                claimed = conn.execute(
+                    """
+                    UPDATE execution_jobs SET status = ?, started_date = ?, owner = ?, heartbeat_date = ?
+                    WHERE job_id = ? AND status = ? AND cancel_requested = 0
+                    """,
+                    (JOB_RUNNING, now, REPLICA_ID, now, job_id, JOB_QUEUED)
+                ).rowcount
+            if not claimed:
+                return
+            self._execute(job_id, request_id, timeout_seconds, bool(resume))
+        finally:
+            slot.release()
+
+    def _execute(self, job_id, request_id, timeout_seconds, resume):
+        state = {"timer": None, "reason": None}
+        
+        try:
+            success, result = execute_dml_request(
+                request_id, on_connect=self._watcher([job_id], state, timeout_seconds),
+                should_stop=self._stop_check([job_id], state), resume=resume,
+                env_slot=self.env_slot
+            )
+        except Exception as e:
+            success, result = False, str(e)
+            with app_transaction() as conn:
+                conn.execute(
+                    """
+                    UPDATE dml_requests SET status = ?, execution_date = ?, execution_result = ?
+                    WHERE request_id = ? AND status = ?
+                    """,
+                    (STATUS_FAILED, datetime.datetime.now(), result, request_id, STATUS_EXECUTING)
+                )
+                bump_data_version(conn)
+        finally:
+            self._unwatch([job_id], state)
+        
+        finish_execution_job(job_id, request_id, success, result, state["reason"], timeout_seconds)
+
+    # Run a group of approved requests for one target (see execute_request_group) on a worker,
+    # under the execution timeout and cancellable through any of its jobs. slot is the target's
+    # slot, taken by the caller and released when the group finishes. Returns a future for the
+    # group's outcomes.
+    def submit_group(self, request_ids, submitted_by, mode, slot):
+        return self._pool.submit(self._run_group, request_ids, submitted_by, mode, slot)
+
+    def _run_group(self, request_ids, submitted_by, mode, slot):
+        state = {"timer": None, "reason": None}
+        watched = []
+        
+        def on_connect(db_conn, job_ids):
+            watched[:] = job_ids
+            self._watcher(job_ids, state, EXECUTION_TIMEOUT)(db_conn)
+        
+        try:
+            return execute_request_group(request_ids, submitted_by, mode, on_connect=on_connect,
+                                         should_stop=self._stop_check(watched, state))
+        finally:
+            self._unwatch(watched, state)
+            slot.release()
+
+    def recover(self):
+        # Queued jobs simply resume; running ones are left to their owners' heartbeats
+        recover_stale_jobs()
+        with app_db() as conn:
+            queued = [row[0] for row in conn.execute(
+                "SELECT job_id FROM execution_jobs WHERE status = ? ORDER BY submitted_date", (JOB_QUEUED,)
+            )]
+        
+        for job_id in queued:
+            self.submit(job_id)
+
+# Condition (and its parameter) matching running work whose owner stopped checking in; rows
+# from before owners were recorded have no heartbeat and count as stale
+def _stale_owner_condition(now):
+    return "(heartbeat_date IS NULL OR heartbeat_date < ?)", now - datetime.timedelta(seconds=EXECUTION_OWNER_TIMEOUT)
+
+# Jobs left running by a replica that stopped may or may not have committed on the target,
+# so fail them (and their rollout targets) for a human to check. Returns the request ids.
+def recover_stale_jobs():
+    now = datetime.datetime.now()
+    stale, cutoff = _stale_owner_condition(now)
+    message = "Execution interrupted by an application restart; check the target before retrying"
+    with app_transaction() as conn:
+        interrupted = [row[0] for row in conn.execute(
+            f"SELECT request_id FROM execution_jobs WHERE status = ? AND {stale}", (JOB_RUNNING, cutoff)
+        )]
+        if not interrupted:
+            return []
+        conn.execute(
+            f"UPDATE execution_jobs SET status = ?, finished_date = ?, message = ? WHERE status = ? AND {stale}",
+            (JOB_INTERRUPTED, now, message, JOB_RUNNING, cutoff)
+        )
+        conn.executemany(
+            """
+            UPDATE dml_requests SET status = ?, execution_date = ?, execution_result = ?
+            WHERE request_id = ? AND status = ?
+            """,
+            [(STATUS_FAILED, now, message, request_id, STATUS_EXECUTING) for request_id in interrupted]
+        )
+        conn.executemany(
+            """
+            UPDATE request_targets SET status = ?, execution_date = ?, execution_result = ?
+            WHERE request_id = ? AND status = ?
+            """,
+            [(STATUS_FAILED, now, message, request_id, STATUS_EXECUTING) for request_id in interrupted]
+        )
+        bump_data_version(conn)
+    return interrupted
+
+# Scheduled requests left running by a replica that stopped may have committed on the target;
+# fail them for review. Returns the request ids.
+def recover_stale_schedules():
+    now = datetime.datetime.now()
+    stale, cutoff = _stale_owner_condition(now)
+    message = "Scheduled execution interrupted by a restart; check the target before retrying"
+    with app_transaction() as conn:
+        interrupted = [row[0] for row in conn.execute(
+            f"SELECT request_id FROM execution_schedules WHERE status = ? AND {stale}", (SCHEDULE_RUNNING, cutoff)
+        )]
+        if not interrupted:
+            return []
+        conn.execute(
+            f"""
+            UPDATE execution_schedules SET status = ?, finished_date = ?, message = ?
+            WHERE status = ? AND {stale}
+            """,
+            (SCHEDULE_FAILED, now, message, SCHEDULE_RUNNING, cutoff)
+        )
+        for request_id in interrupted:
+            _fail_unfinished_request(conn, request_id, message)
+        bump_data_version(conn)
+    return interrupted
+
+# Wait before a background loop's next pass: its interval, doubled for each consecutive failure
+# up to limit (never below the interval itself)
+def retry_delay(interval, failures, limit=BACKGROUND_RETRY_MAX_DELAY):
+    return min(interval * 2 ** failures, max(interval, limit))
+
+# Background thread that refreshes the heartbeat on the work this replica is running and
+# fails work abandoned by replicas that stopped
+class ExecutionHeartbeat:
+    def __init__(self, interval):
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="dml-heartbeat", daemon=True)
+
+    def start(self):
+        self._thread.start()
 
-# Initialize application database
-def init_app_db():
-    conn = get_app_db_connection()
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        username TEXT PRIMARY KEY,
-        password_hash TEXT NOT NULL,
-        role TEXT NOT NULL,
-        email TEXT NOT NULL
-    )
-    ''')
-    
-    # Create requests table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS dml_requests (
-        request_id TEXT PRIMARY KEY,
-        requestor TEXT NOT NULL,
-        dml_statement TEXT NOT NULL,
-        target_db TEXT NOT NULL,
-        target_schema TEXT NOT NULL,
-        status TEXT NOT NULL,
-        created_date TIMESTAMP NOT NULL,
-        manager_username TEXT,
-        manager_comments TEXT,
-        manager_action_date TIMESTAMP,
-        support_username TEXT,
-        support_comments TEXT,
-        support_action_date TIMESTAMP,
-        execution_date TIMESTAMP,
-        execution_result TEXT
-    )
-    ''')
-    
-    # Create db_connections table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS db_connections (
-        env_name TEXT PRIMARY KEY,
-        connection_string TEXT NOT NULL,
-        description TEXT
-    )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    def stop(self):
+        self._stop.set()
 
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    def beat(self):
+        now = datetime.datetime.now()
+        with app_transaction() as conn:
+            conn.execute(
+                "UPDATE execution_jobs SET heartbeat_date = ? WHERE owner = ? AND status = ?",
+                (now, REPLICA_ID, JOB_RUNNING)
+            )
+            conn.execute(
+                "UPDATE execution_schedules SET heartbeat_date = ? WHERE owner = ? AND status = ?",
+                (now, REPLICA_ID, SCHEDULE_RUNNING)
+            )
 
-# Function to authenticate users
-def authenticate(username, password):
-    conn = get_app_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT username, role FROM users WHERE username = ? AND password_hash = ?", 
-        (username, hash_password(password))
-    )
+    def _loop(self):
+        # Back off no further than a third of the owner timeout, so a few failed beats (e.g. on
+        # a locked app DB) don't let other replicas take this one's work for abandoned
+        failures = 0
+        while not self._stop.wait(retry_delay(self._interval, failures, EXECUTION_OWNER_TIMEOUT / 3)):
+            try:
+                self.beat()
+                recover_stale_jobs()
+                recover_stale_schedules()
+                failures = 0
+            except Exception:
+                failures += 1
+                logger.exception("Execution heartbeat failed (%d in a row)", failures)
+
+# Shared heartbeat, started by whichever of the engine or scheduler comes up first
+@st.cache_resource
+def get_execution_heartbeat():
+    heartbeat = ExecutionHeartbeat(EXECUTION_HEARTBEAT_INTERVAL)
+    heartbeat.start()
+    return heartbeat
+
+# Shared execution engine; resumes persisted jobs the first time it is created
+@st.cache_resource
+def get_execution_engine():
+    engine = ExecutionEngine(EXECUTOR_WORKERS, get_env_slots())
+    get_execution_heartbeat()
+    engine.recover()
+    return engine
+
+# Queue an approved request for background execution; resume=True re-queues a failed
+# request to continue after its last committed batch
+@timed("db.enqueue_execution")
+def enqueue_execution(request_id, submitted_by, timeout_seconds=None, resume=False):
+    job_id = str(uuid.uuid4())
+    expected_status = STATUS_FAILED if resume else STATUS_APPROVED
     
-    user = cursor.fetchone()
-    conn.close()
+    with app_transaction() as conn:
+        # Only an approved (or, to resume, failed) request can be queued, and only once
+        moved = conn.execute(
+            "UPDATE dml_requests SET status = ? WHERE request_id = ? AND status = ?",
+            (STATUS_EXECUTING, request_id, expected_status)
+        ).rowcount
+        if not moved:
+            return None
+        
+        target_db = conn.execute(
+            "SELECT target_db FROM dml_requests WHERE request_id = ?", (request_id,)
+        ).fetchone()[0]
+        conn.execute(
+            """
+            INSERT INTO execution_jobs
+            (job_id, request_id, target_db, status, submitted_by, submitted_date, timeout_seconds, resume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (job_id, request_id, target_db, JOB_QUEUED, submitted_by, datetime.datetime.now(),
+             timeout_seconds or EXECUTION_TIMEOUT, int(resume))
+        )
+        bump_data_version(conn)
     
-    if user:
-        return True, user[0], user[1]
-    return False, None, None
+    get_execution_engine().submit(job_id)
+    return job_id
 
-# Function to create a new DML request
-def create_dml_request(username, dml_statement, target_db, target_schema):
-    conn = get_app_db_connection()
-    cursor = conn.cursor()
-    
-    request_id = str(uuid.uuid4())
-    created_date = datetime.datetime.now()
+# Re-queue a failed request from its last checkpoint
+def resume_execution(request_id, submitted_by, timeout_seconds=None):
+    return enqueue_execution(request_id, submitted_by, timeout_seconds, resume=True)
+
+# Record how an execution job ended; reason is why it was interrupted (JOB_TIMED_OUT or
+# JOB_CANCELLED), if it was. Returns the job's message.
+def finish_execution_job(job_id, request_id, success, result, reason, timeout_seconds):
+    if success:
+        job_status, message = JOB_SUCCEEDED, result
+    elif reason == JOB_TIMED_OUT:
+        job_status, message = JOB_TIMED_OUT, f"Timed out after {timeout_seconds}s: {result}"
+    elif reason == JOB_CANCELLED:
+        job_status, message = JOB_CANCELLED, f"Cancelled: {result}"
+    else:
+        job_status, message = JOB_FAILED, result
     
-    cursor.execute(
-        """
-        INSERT INTO dml_requests 
-        (request_id, requestor, dml_statement, target_db, target_schema, status, created_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (request_id, username, dml_statement, target_db, target_schema, 
-         STATUS_PENDING_MANAGER, created_date)
-    )
+    with app_transaction() as conn:
+        _update_job(conn, job_id, job_status, finished_date=datetime.datetime.now(), message=message)
+        if job_status != JOB_SUCCEEDED:
+            conn.execute(
+                "UPDATE dml_requests SET execution_result = ? WHERE request_id = ?",
+                (message, request_id)
+            )
+        bump_data_version(conn)
+    return message
+
+# Cancel a queued or running execution job
+def cancel_execution(job_id, username):
+    with app_transaction() as conn:
+        job = conn.execute(
+            "SELECT request_id, status, resume FROM execution_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if job is None or job[1] not in JOB_ACTIVE_STATES:
+            return False
+        request_id, job_status, resume = job
+        
+        conn.execute("UPDATE execution_jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+        
+        # A job that never started just goes away and the request goes back to where it was
+        if job_status == JOB_QUEUED:
+            _update_job(conn, job_id, JOB_CANCELLED, finished_date=datetime.datetime.now(),
+                        message=f"Cancelled by {username} before it started")
+            conn.execute(
+                "UPDATE dml_requests SET status = ? WHERE request_id = ? AND status = ?",
+                (STATUS_FAILED if resume else STATUS_APPROVED, request_id, STATUS_EXECUTING)
+            )
+            bump_data_version(conn)
+            return True
     
-    conn.commit()
-    conn.close()
-    return request_id
+    # Whichever replica runs the job stops at its next check; interrupt it now if it runs here
+    get_execution_engine().interrupt(job_id, JOB_CANCELLED)
+    if SCHEDULER_ENABLED:
+        get_execution_scheduler().interrupt(job_id, JOB_CANCELLED)
+    return True
 
-# Function to get pending requests for a manager
-def get_pending_manager_requests():
-    conn = get_app_db_connection()
-    df = pd.read_sql_query(
-        f"SELECT * FROM dml_requests WHERE status = '{STATUS_PENDING_MANAGER}'",
-        conn
-    )
-    conn.close()
-    return df
+# Whether a cancel was requested on any of the jobs
+def cancel_requested(job_ids):
+    with app_db() as conn:
+        return conn.execute(
+            f"""
+            SELECT 1 FROM execution_jobs
+            WHERE job_id IN ({", ".join("?" * len(job_ids))}) AND cancel_requested = 1 LIMIT 1
+            """,
+            tuple(job_ids)
+        ).fetchone() is not None
 
-# Function to get pending requests for production support
-def get_pending_prod_requests():
-    conn = get_app_db_connection()
-    df = pd.read_sql_query(
-        f"SELECT * FROM dml_requests WHERE status = '{STATUS_PENDING_PROD}'",
-        conn
+# Function to get the most recent execution jobs
+def get_execution_jobs(limit=PAGE_SIZE):
+    with app_db() as conn:
+        return pd.read_sql_query(
+            """
+            SELECT j.job_id, j.request_id, j.target_db, j.status, j.resume, j.submitted_by,
+                   j.submitted_date, j.started_date, j.finished_date,
+                   r.statements_executed, r.statement_count, r.rows_affected, j.message
+            FROM (
+                SELECT * FROM execution_jobs ORDER BY submitted_date DESC LIMIT ?
+            ) j
+            JOIN dml_requests r ON r.request_id = j.request_id
+            ORDER BY j.submitted_date DESC
+            """,
+            conn, params=(limit,)
+        )
+
+# Function to get failed requests that can resume from their last checkpoint
+def get_resumable_requests(cursor=None, page_size=PAGE_SIZE):
+    return fetch_request_page(
+        "status = ? AND (statement_count IS NOT NULL OR rollout_mode IS NOT NULL)",
+        (STATUS_FAILED,), "created_date",
+        cursor=cursor, page_size=page_size,
+        columns=REQUEST_SUMMARY_COLUMNS + ", statements_executed, statement_count, rows_affected"
     )
-    conn.close()
-    return df
 
-# Function to update request status by manager
-def update_manager_decision(request_id, manager_username, approved, comments):
-    conn = get_app_db_connection()
-    cursor = conn.cursor()
-    
-    action_date = datetime.datetime.now()
-    status = STATUS_PENDING_PROD if approved else STATUS_REJECTED_MANAGER
-    
-    cursor.execute(
+# Mark a request that never got going as failed (requests that ran record their own outcome)
+def _fail_unfinished_request(conn, request_id, message):
+    conn.execute(
         """
-        UPDATE dml_requests 
-        SET status = ?, manager_username = ?, manager_comments = ?, manager_action_date = ?
-        WHERE request_id = ?
+        UPDATE dml_requests SET status = ?, execution_date = ?, execution_result = ?
+        WHERE request_id = ? AND status = ?
         """,
-        (status, manager_username, comments, action_date, request_id)
+        (STATUS_FAILED, datetime.datetime.now(), message, request_id, STATUS_EXECUTING)
     )
-    
-    conn.commit()
-    conn.close()
 
-# Function to update request status by production support
-def update_prod_support_decision(request_id, support_username, approved, comments):
-    conn = get_app_db_connection()
-    cursor = conn.cursor()
+# Run several claimed requests for one target back to back on a single pooled connection.
+# before_each(request_id) runs ahead of every request; once it returns False no more requests
+# start, and those left over are the caller's to release. execute(request_id, db_conn) runs one
+# request (execute_dml_request by default) and on_result receives (request_id, success, result).
+# Rollouts span several targets, so they get db_conn=None and open their own connections.
+def run_request_group(target_db, request_ids, before_each=None, on_result=None, execute=None):
+    with app_db() as conn:
+        connection_result = conn.execute(
+            "SELECT connection_string FROM db_connections WHERE env_name = ?", (target_db,)
+        ).fetchone()
+        rollouts = {row[0] for row in conn.execute(
+            f"""
+            SELECT request_id FROM dml_requests
+            WHERE request_id IN ({", ".join("?" * len(request_ids))}) AND rollout_mode IS NOT NULL
+            """,
+            tuple(request_ids)
+        )}
     
-    action_date = datetime.datetime.now()
-    status = STATUS_APPROVED if approved else STATUS_REJECTED_PROD
+    outcomes = []
+    execute = execute or (lambda request_id, db_conn: execute_dml_request(request_id, db_conn=db_conn))
     
-    cursor.execute(
-        """
-        UPDATE dml_requests 
-        SET status = ?, support_username = ?, support_comments = ?, support_action_date = ?
-        WHERE request_id = ?
-        """,
-        (status, support_username, comments, action_date, request_id)
-    )
+    def run(request_id, db_conn):
+        if before_each and not before_each(request_id):
+            return False
+        try:
+            success, result = execute(request_id, db_conn)
+        except Exception as e:
+            success, result = False, str(e)
+        if not success:
+            with app_transaction() as conn:
+                _fail_unfinished_request(conn, request_id, result)
+                bump_data_version(conn)
+        outcomes.append((request_id, success, result))
+        if on_result:
+            on_result(request_id, success, result)
+        return True
     
-    conn.commit()
-    conn.close()
-
-# Function to execute approved DML
-def execute_dml_request(request_id):
-    conn = get_app_db_connection()
-    cursor = conn.cursor()
+    for request_id in [request_id for request_id in request_ids if request_id in rollouts]:
+        if not run(request_id, None):
+            return outcomes
     
-    # Get the request details
-    cursor.execute("SELECT dml_statement, target_db, target_schema FROM dml_requests WHERE request_id = ?", 
-                   (request_id,))
-    request = cursor.fetchone()
+    single_target = [request_id for request_id in request_ids if request_id not in rollouts]
+    if not single_target:
+        return outcomes
     
-    if not request:
-        return False, "Request not found"
+    try:
+        if not connection_result:
+            raise ValueError(f"No connection configuration found for {target_db}")
+        with get_engine_registry().connect(target_db, connection_result[0]) as db_conn:
+            for request_id in single_target:
+                if not run(request_id, db_conn):
+                    return outcomes
+    except Exception as e:
+        # The shared connection couldn't be opened (or broke); fail whatever didn't run
+        finished = {outcome[0] for outcome in outcomes}
+        for request_id in single_target:
+            if request_id not in finished:
+                with app_transaction() as conn:
+                    _fail_unfinished_request(conn, request_id, str(e))
+                    bump_data_version(conn)
+                outcomes.append((request_id, False, str(e)))
+                if on_result:
+                    on_result(request_id, False, str(e))
+    
+    return outcomes
+
+# Run several approved requests for the same target and schema on one pooled connection.
+# GROUP_ATOMIC commits them together, so one failure rolls the whole group back and the
+# others return to Approved; GROUP_SAVEPOINT runs each request in a savepoint, keeping the
+# ones that succeed. Each claimed request gets a running job owned by this replica, so a crash
+# mid-group is recovered like any other job. on_connect(db_conn, job_ids) is called with the
+# target connection; once should_stop() returns a reason (JOB_CANCELLED or JOB_TIMED_OUT) the
+# whole group is rolled back in either mode (an interrupted statement may already have taken
+# the transaction down with it) and the requests go back to Approved, bar the interrupted one.
+# Returns [(request_id, status, result)] in the order given.
+@timed("execute.group")
+def execute_request_group(request_ids, submitted_by, mode=GROUP_ATOMIC, on_connect=None, should_stop=None):
+    request_ids = list(dict.fromkeys(request_ids))
+    if not request_ids:
+        return []
+    placeholders = ", ".join("?" * len(request_ids))
     
-    dml_statement, target_db, target_schema = request
+    with app_transaction() as conn:
+        requests = {row.request_id: row for row in fetch_rows(
+            conn,
+            f"""
+            SELECT request_id, dml_statement, target_db, target_schema, rollout_mode, status
+            FROM dml_requests WHERE request_id IN ({placeholders})
+            """,
+            request_ids
+        )}
+        targets = {(row.target_db, row.target_schema) for row in requests.values()}
+        if len(targets) > 1:
+            raise ValueError("Grouped requests must share one target database and schema")
+        if any(row.rollout_mode for row in requests.values()):
+            raise ValueError("Rollout requests span several targets and can't be grouped")
+        
+        # Claim the requests that are still approved; anything else was picked up elsewhere
+        claimed = [
+            request_id for request_id in request_ids
+            if request_id in requests and conn.execute(
+                "UPDATE dml_requests SET status = ? WHERE request_id = ? AND status = ?",
+                (STATUS_EXECUTING, request_id, STATUS_APPROVED)
+            ).rowcount
+        ]
+        conn.executemany("DELETE FROM execution_checkpoints WHERE request_id = ?",
+                         [(request_id,) for request_id in claimed])
+        
+        target_db, target_schema = targets.pop() if targets else (None, None)
+        now = datetime.datetime.now()
+        job_ids = {request_id: str(uuid.uuid4()) for request_id in claimed}
+        conn.executemany(
+            """
+            INSERT INTO execution_jobs
+            (job_id, request_id, target_db, status, submitted_by, submitted_date, started_date,
+             timeout_seconds, owner, heartbeat_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(job_ids[request_id], request_id, target_db, JOB_RUNNING, submitted_by, now, now,
+              EXECUTION_TIMEOUT, REPLICA_ID, now)
+             for request_id in claimed]
+        )
+        if claimed:
+            bump_data_version(conn)
+        connection_result = conn.execute(
+            "SELECT connection_string FROM db_connections WHERE env_name = ?", (target_db,)
+        ).fetchone()
     
-    # Get connection string
-    cursor.execute("SELECT connection_string FROM db_connections WHERE env_name = ?", 
-                   (target_db,))
-    connection_result = cursor.fetchone()
+    outcomes = {
+        request_id: (requests[request_id].status if request_id in requests else "Not found",
+                     "Skipped: not approved for execution", None, None)
+        for request_id in request_ids if request_id not in claimed
+    }
+    if not claimed:
+        return [(request_id, outcomes[request_id][0], outcomes[request_id][1]) for request_id in request_ids]
     
-    if not connection_result:
-        return False, f"No connection configuration found for {target_db}"
+    # Keep this replica's heartbeat going on the group's jobs while they run
+    get_execution_heartbeat()
+    statements = {request_id: list(split_sql_statements(requests[request_id].dml_statement))
+                  for request_id in claimed}
+    executed = {}
+    stopped = None
     
-    connection_string = connection_result[0]
+    def run(db_conn, request_id):
+        rows_affected = 0
+        for statement in statements[request_id]:
+            rows_affected += max(db_conn.exec_driver_sql(statement).rowcount, 0)
+        executed[request_id] = rows_affected
     
-    # Execute the DML statement
     try:
-        engine = create_engine(connection_string)
-        with engine.connect() as db_conn:
-            # Set schema if needed
-            if target_schema:
-                db_conn.execute(f"USE {target_schema}")
-            
-            # Execute the DML
-            db_conn.execute(dml_statement)
-            
-        execution_date = datetime.datetime.now()
-        execution_result = "Success"
-        status = STATUS_EXECUTED
+        if not connection_result:
+            raise ValueError(f"No connection configuration found for {target_db}")
+        with get_engine_registry().connect(target_db, connection_result[0]) as db_conn:
+            if on_connect:
+                on_connect(db_conn, list(job_ids.values()))
+            with stage_timer("target.statements", target_db), db_conn.begin():
+                set_target_schema(db_conn, target_schema)
+                for request_id in claimed:
+                    stopped = should_stop() if should_stop else None
+                    if stopped:
+                        raise RuntimeError(f"Group stopped: {stopped}")
+                    try:
+                        if mode == GROUP_SAVEPOINT:
+                            with db_conn.begin_nested():
+                                run(db_conn, request_id)
+                        else:
+                            run(db_conn, request_id)
+                    except Exception as e:
+                        stopped = should_stop() if should_stop else None
+                        result = (f"{stopped} while running; rolled back" if stopped
+                                  else f"Failed and was rolled back: {e}")
+                        outcomes[request_id] = (STATUS_FAILED, result, 0, 0)
+                        if mode != GROUP_SAVEPOINT or stopped:
+                            raise
+        
+        for request_id, rows_affected in executed.items():
+            outcomes[request_id] = (
+                STATUS_EXECUTED,
+                f"Success: {len(statements[request_id])} statement(s), grouped ({mode})",
+                len(statements[request_id]), rows_affected
+            )
     except Exception as e:
-        execution_date = datetime.datetime.now()
-        execution_result = str(e)
-        status = STATUS_FAILED
-    
-    # Update the request status
-    cursor.execute(
-        """
-        UPDATE dml_requests 
-        SET status = ?, execution_date = ?, execution_result = ?
-        WHERE request_id = ?
-        """,
-        (status, execution_date, execution_result, request_id)
-    )
+        failed = [request_id for request_id in claimed if request_id in outcomes]
+        for request_id in claimed:
+            if request_id in outcomes:
+                continue
+            if (failed and mode == GROUP_ATOMIC) or stopped:
+                # Nothing in the group was committed, so the rest can simply run again
+                cause = f"group {stopped.lower()}" if stopped else f"{failed[0]} failed"
+                outcomes[request_id] = (STATUS_APPROVED, f"Rolled back with the group: {cause}", 0, 0)
+            else:
+                outcomes[request_id] = (STATUS_FAILED, f"Group execution failed: {e}", 0, 0)
     
-    conn.commit()
-    conn.close()
+    # Write every claimed request's outcome back in one transaction
+    execution_date = datetime.datetime.now()
+    with stage_timer("execute.status_update", target_db), app_transaction() as conn:
+        conn.executemany(
+            """
+            UPDATE dml_requests
+            SET status = ?, execution_date = ?, execution_result = ?,
+                statement_count = ?, statements_executed = ?, rows_affected = ?
+            WHERE request_id = ? AND status = ?
+            """,
+            [(outcomes[request_id][0],
+              None if outcomes[request_id][0] == STATUS_APPROVED else execution_date,
+              outcomes[request_id][1], len(statements[request_id]),
+              outcomes[request_id][2] or 0, outcomes[request_id][3] or 0,
+              request_id, STATUS_EXECUTING)
+             for request_id in claimed]
+        )
+        conn.executemany(
+            """
+            UPDATE execution_jobs SET status = ?, finished_date = ?, message = ?
+            WHERE job_id = ? AND status = ?
+            """,
+            [({STATUS_EXECUTED: JOB_SUCCEEDED, STATUS_APPROVED: JOB_CANCELLED}.get(
+                 outcomes[request_id][0], stopped or JOB_FAILED
+              ), execution_date, outcomes[request_id][1], job_ids[request_id], JOB_RUNNING)
+             for request_id in claimed]
+        )
+        bump_data_version(conn)
     
-    return status == STATUS_EXECUTED, execution_result
+    return [(request_id, outcomes[request_id][0], outcomes[request_id][1]) for request_id in request_ids]
 
-# Function to get user's request history
-def get_user_requests(username):
-    conn = get_app_db_connection()
-    df = pd.read_sql_query(
-        "SELECT * FROM dml_requests WHERE requestor = ? ORDER BY created_date DESC",
-        conn, params=(username,)
+# Spaces out calls to acquire() so they happen at most rate_per_minute times a minute
+class RateLimiter:
+    def __init__(self, rate_per_minute):
+        self._interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            time.sleep(wait)
+
+# Schedule an approved request to run no earlier than not_before, optionally only inside a
+# daily window; higher priorities run first
+def schedule_execution(request_id, scheduled_by, not_before=None, window_start=None,
+                       window_end=None, priority=0):
+    with app_transaction() as conn:
+        request = conn.execute(
+            "SELECT target_db FROM dml_requests WHERE request_id = ? AND status = ?",
+            (request_id, STATUS_APPROVED)
+        ).fetchone()
+        if request is None:
+            return False
+        
+        now = datetime.datetime.now()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO execution_schedules
+            (request_id, target_db, priority, not_before, window_start, window_end, status,
+             scheduled_by, scheduled_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (request_id, request[0], priority, not_before or now, window_start or None,
+             window_end or None, SCHEDULE_PENDING, scheduled_by, now)
+        )
+    return True
+
+# Take a request off the schedule before it starts
+def unschedule_execution(request_id, username):
+    with app_transaction() as conn:
+        return conn.execute(
+            """
+            UPDATE execution_schedules SET status = ?, finished_date = ?, message = ?
+            WHERE request_id = ? AND status = ?
+            """,
+            (SCHEDULE_CANCELLED, datetime.datetime.now(), f"Unscheduled by {username}",
+             request_id, SCHEDULE_PENDING)
+        ).rowcount > 0
+
+# Condition on execution_schedules that its daily "HH:MM" window (which may wrap past
+# midnight) is open at the clock time bound to all four placeholders; no window is always open
+SCHEDULE_WINDOW_OPEN = """
+    (COALESCE(window_start, '') = '' OR COALESCE(window_end, '') = ''
+     OR (window_start <= window_end AND window_start <= ? AND ? < window_end)
+     OR (window_start > window_end AND (? >= window_start OR ? < window_end)))
+"""
+
+# Scheduled requests that may start now, highest priority first
+def get_due_schedules(now=None, limit=SCHEDULER_BATCH_LIMIT):
+    now = now or datetime.datetime.now()
+    clock = now.strftime("%H:%M")
+    with app_db() as conn:
+        # Windows are tested before the LIMIT, so requests waiting for a closed window can't
+        # crowd out due ones
+        return conn.execute(
+            f"""
+            SELECT s.request_id, s.target_db, r.rollout_mode
+            FROM execution_schedules s JOIN dml_requests r ON r.request_id = s.request_id
+            WHERE s.status = ? AND s.not_before <= ? AND {SCHEDULE_WINDOW_OPEN}
+            ORDER BY s.priority DESC, s.not_before, s.scheduled_date
+            LIMIT ?
+            """,
+            (SCHEDULE_PENDING, now, clock, clock, clock, clock, limit)
+        ).fetchall()
+
+# Whether a scheduled request's window is still open
+def schedule_window_open(request_id, now=None):
+    clock = (now or datetime.datetime.now()).strftime("%H:%M")
+    with app_db() as conn:
+        return conn.execute(
+            f"SELECT 1 FROM execution_schedules WHERE request_id = ? AND {SCHEDULE_WINDOW_OPEN}",
+            (request_id, clock, clock, clock, clock)
+        ).fetchone() is not None
+
+# Function to get scheduled executions that haven't finished yet
+def get_scheduled_executions():
+    with app_db() as conn:
+        return pd.read_sql_query(
+            """
+            SELECT request_id, target_db, priority, not_before, window_start, window_end,
+                   status, scheduled_by, started_date
+            FROM execution_schedules
+            WHERE status IN (?, ?)
+            ORDER BY status, priority DESC, not_before
+            """,
+            conn, params=(SCHEDULE_PENDING, SCHEDULE_RUNNING)
+        )
+
+# Start scheduled requests in order, moving each from Approved to Executing. Requests that
+# were executed or queued some other way meanwhile are skipped. Returns the claimed ids.
+def _claim_schedules(request_ids):
+    claimed = []
+    now = datetime.datetime.now()
+    with app_transaction() as conn:
+        for request_id in request_ids:
+            moved = conn.execute(
+                "UPDATE dml_requests SET status = ? WHERE request_id = ? AND status = ?",
+                (STATUS_EXECUTING, request_id, STATUS_APPROVED)
+            ).rowcount
+            if moved:
+                conn.execute(
+                    """
+                    UPDATE execution_schedules SET status = ?, started_date = ?, owner = ?, heartbeat_date = ?
+                    WHERE request_id = ? AND status = ?
+                    """,
+                    (SCHEDULE_RUNNING, now, REPLICA_ID, now, request_id, SCHEDULE_PENDING)
+                )
+                claimed.append(request_id)
+            else:
+                conn.execute(
+                    """
+                    UPDATE execution_schedules SET status = ?, finished_date = ?, message = ?
+                    WHERE request_id = ? AND status = ?
+                    """,
+                    (SCHEDULE_SKIPPED, now, "Request was no longer approved", request_id, SCHEDULE_PENDING)
+                )
+        if claimed:
+            bump_data_version(conn)
+    return claimed
+
+# Put claimed scheduled requests that never started back on the schedule, e.g. once their
+# window closed while earlier requests of the group ran
+def _release_schedules(request_ids):
+    with app_transaction() as conn:
+        for request_id in request_ids:
+            released = conn.execute(
+                "UPDATE dml_requests SET status = ? WHERE request_id = ? AND status = ?",
+                (STATUS_APPROVED, request_id, STATUS_EXECUTING)
+            ).rowcount
+            if released:
+                conn.execute(
+                    """
+                    UPDATE execution_schedules SET status = ?, started_date = NULL, owner = NULL,
+                           heartbeat_date = NULL
+                    WHERE request_id = ? AND status = ?
+                    """,
+                    (SCHEDULE_PENDING, request_id, SCHEDULE_RUNNING)
+                )
+        if request_ids:
+            bump_data_version(conn)
+
+# Record a scheduled request that is starting as a running job of this replica, so it is
+# listed, timed out and cancelled like any other execution job. Returns the job id.
+def _start_scheduled_job(request_id):
+    job_id = str(uuid.uuid4())
+    now = datetime.datetime.now()
+    with app_transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO execution_jobs
+            (job_id, request_id, target_db, status, submitted_by, submitted_date, started_date,
+             timeout_seconds, owner, heartbeat_date)
+            SELECT ?, request_id, target_db, ?, scheduled_by, scheduled_date, ?, ?, ?, ?
+            FROM execution_schedules WHERE request_id = ?
+            """,
+            (job_id, JOB_RUNNING, now, EXECUTION_TIMEOUT, REPLICA_ID, now, request_id)
+        )
+    return job_id
+
+# Local loop that starts due scheduled requests, one connection-sharing group per target.
+# Each request runs as an execution job under the execution timeout, and a group stops
+# starting requests once their window closes (or the scheduler stops).
+class ExecutionScheduler(ExecutionWatch):
+    def __init__(self, poll_interval, workers, env_slots, target_rate):
+        super().__init__()
+        self._poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dml-scheduler")
+        self._env_slots = env_slots
+        self._target_rate = target_rate
+        self._rate_limiters = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        get_execution_heartbeat()
+        self.recover()
+        self._thread = threading.Thread(target=self._loop, name="dml-scheduler-loop", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._pool.shutdown(wait=wait)
+
+    def _loop(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                failures = 0
+            except Exception:
+                # Keep polling; a failed tick (e.g. a locked app DB) is retried after a backoff
+                failures += 1
+                logger.exception("Scheduler poll failed (%d in a row)", failures)
+            self._stop.wait(retry_delay(self._poll_interval, failures))
+
+    def _target_state(self, target_db):
+        with self._lock:
+            if target_db not in self._rate_limiters:
+                self._rate_limiters[target_db] = RateLimiter(self._target_rate)
+            return self._env_slots.slot(target_db), self._rate_limiters[target_db]
+
+    def run_once(self, now=None):
+        # Targets are visited in order of their most urgent request
+        groups, rollouts = {}, {}
+        for request_id, target_db, rollout_mode in get_due_schedules(now):
+            if rollout_mode:
+                rollouts[request_id] = target_db
+            else:
+                groups.setdefault(target_db, []).append(request_id)
+        
+        # Rollouts don't hold a group slot; each target takes its own as the rollout reaches it
+        futures = [
+            self._pool.submit(self._run_rollout, rollouts[request_id], request_id)
+            for request_id in _claim_schedules(list(rollouts))
+        ]
+        for target_db, request_ids in groups.items():
+            slot, limiter = self._target_state(target_db)
+            if not slot.acquire(blocking=False):
+                continue
+            claimed = _claim_schedules(request_ids)
+            if not claimed:
+                slot.release()
+                continue
+            futures.append(self._pool.submit(self._run_group, target_db, claimed, slot, limiter))
+        return futures
+
+    def _run_group(self, target_db, request_ids, slot, limiter):
+        try:
+            with stage_timer("scheduler.group", target_db):
+                self._run_claimed(target_db, request_ids, limiter.acquire)
+        finally:
+            slot.release()
+
+    def _run_rollout(self, target_db, request_id):
+        with stage_timer("scheduler.rollout", target_db):
+            self._run_claimed(target_db, [request_id])
+
+    def _run_claimed(self, target_db, request_ids, before_each=None):
+        def start(request_id):
+            if before_each:
+                before_each()
+            return not self._stop.is_set() and schedule_window_open(request_id)
+        
+        outcomes = run_request_group(target_db, request_ids, start, self._record, self._execute)
+        started = {outcome[0] for outcome in outcomes}
+        _release_schedules([request_id for request_id in request_ids if request_id not in started])
+
+    def _execute(self, request_id, db_conn):
+        job_id = _start_scheduled_job(request_id)
+        state = {"timer": None, "reason": None}
+        try:
+            success, result = execute_dml_request(
+                request_id, on_connect=self._watcher([job_id], state, EXECUTION_TIMEOUT),
+                should_stop=self._stop_check([job_id], state), env_slot=self._env_slots.slot,
+                db_conn=db_conn
+            )
+        except Exception as e:
+            success, result = False, str(e)
+        finally:
+            self._unwatch([job_id], state)
+        
+        return success, finish_execution_job(job_id, request_id, success, result, state["reason"],
+                                             EXECUTION_TIMEOUT)
+
+    def _record(self, request_id, success, result):
+        with app_transaction() as conn:
+            conn.execute(
+                """
+                UPDATE execution_schedules SET status = ?, finished_date = ?, message = ?
+                WHERE request_id = ? AND status = ?
+                """,
+                (SCHEDULE_DONE if success else SCHEDULE_FAILED, datetime.datetime.now(), result,
+                 request_id, SCHEDULE_RUNNING)
+            )
+
+    def recover(self):
+        # Groups cut short by a stopped replica may have committed on the target; fail them
+        # for review once their owner's heartbeat has lapsed
+        recover_stale_schedules()
+
+# Shared scheduler, started the first time it is requested
+@st.cache_resource
+def get_execution_scheduler():
+    scheduler = ExecutionScheduler(
+        SCHEDULER_POLL_INTERVAL, SCHEDULER_WORKERS, get_env_slots(), SCHEDULER_TARGET_RATE
     )
-    conn.close()
-    return df
+    scheduler.start()
+    return scheduler
 
-# Initialize the database
-init_app_db()
+# Initialize the database once per process; Streamlit reruns skip straight past it
+@st.cache_resource
+def ensure_app_db():
+    init_app_db()
+    return True
+
+ensure_app_db()
 
 # Main application
 def main():
     st.title("DML Management Tool")
     
+    # Start the background executor (and resume any persisted jobs)
+    get_execution_engine()
+    if SCHEDULER_ENABLED:
+        get_execution_scheduler()
+    
     # Navigation based on authentication and role
     if not st.session_state.authenticated:
         login_page()
@@ -274,30 +3914,48 @@ def main():
         # Navigation options based on role
         if st.session_state.role == "requestor":
             page = st.sidebar.radio("Navigation", 
-                                   ["New DML Request", "My Requests"])
+                                   ["New DML Request", "My Requests", "Search"])
             
             if page == "New DML Request":
                 new_request_page()
             elif page == "My Requests":
                 my_requests_page()
+            elif page == "Search":
+                search_page()
                 
         elif st.session_state.role == "manager":
             page = st.sidebar.radio("Navigation", 
-                                   ["Pending Approvals", "My Decisions"])
+                                   ["Pending Approvals", "My Decisions", "Search", "Workflow Analytics",
+                                    "Audit Export"])
             
             if page == "Pending Approvals":
                 manager_approval_page()
             elif page == "My Decisions":
                 manager_decisions_page()
+            elif page == "Search":
+                search_page()
+            elif page == "Workflow Analytics":
+                workflow_analytics_page()
+            elif page == "Audit Export":
+                audit_export_page()
                 
         elif st.session_state.role == "support":
             page = st.sidebar.radio("Navigation", 
-                                   ["Pending Approvals", "Approved Requests"])
+                                   ["Pending Approvals", "Approved Requests", "Search", "Workflow Analytics",
+                                    "Audit Export", "Operations Metrics"])
             
             if page == "Pending Approvals":
                 prod_support_approval_page()
             elif page == "Approved Requests":
                 execute_approved_page()
+            elif page == "Search":
+                search_page()
+            elif page == "Workflow Analytics":
+                workflow_analytics_page()
+            elif page == "Audit Export":
+                audit_export_page()
+            elif page == "Operations Metrics":
+                operations_metrics_page()
         
         # Logout button
         if st.sidebar.button("Logout"):
@@ -305,9 +3963,188 @@ def main():
             st.session_state.username = None
             st.session_state.role = None
             st.session_state.current_page = "login"
-            st.experimental_rerun()
+            st.rerun()
+
+# Page through a keyset-paginated query; the cursors of visited pages live in session state.
+# Pages of a status queue (status given) are kept up to date from the change feed.
+def paginate(key, fetch_page, status=None):
+    state_key = f"pager_{key}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = [None]
+    cursors = st.session_state[state_key]
+    
+    if status is None:
+        rows, next_cursor = fetch_page(cursors[-1])
+    else:
+        rows, next_cursor = live_page(state_key, status, cursors[-1], fetch_page)
+    
+    # Rows on this page may have moved on since it was opened; start over
+    if not rows and len(cursors) > 1:
+        st.session_state[state_key] = [None]
+        rows, next_cursor = fetch_page(None)
+        cursors = st.session_state[state_key]
+    
+    col_prev, col_page, col_next = st.columns(3)
+    if col_prev.button("Previous", key=f"{state_key}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    col_page.write(f"Page {len(cursors)}")
+    if col_next.button("Next", key=f"{state_key}_next", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+    
+    return rows
+
+# Current page of a status queue: the page read on an earlier rerun is kept in session state
+# and only the changes logged since then are applied to it
+def live_page(state_key, status, cursor, fetch_page):
+    held_key = f"{state_key}_held"
+    held = st.session_state.get(held_key)
+    
+    if held is not None and held["cursor"] == cursor:
+        changes = get_changes_since(held["seq"])
+        if changes is not None:
+            refreshed = refresh_queue_page(held["rows"], cursor, held["next"], status, changes)
+            if refreshed is not None:
+                held["rows"], held["next"] = refreshed
+                if changes:
+                    held["seq"] = changes[-1].seq
+                return held["rows"], held["next"]
+    
+    # Read the sequence first, so anything logged during the fetch is replayed next time
+    seq = get_change_seq()
+    rows, next_cursor = fetch_page(cursor)
+    st.session_state[held_key] = {"cursor": cursor, "rows": rows, "next": next_cursor, "seq": seq}
+    return rows, next_cursor
+
+# Optional auto-refresh of a live queue page: a fragment checks the change feed on its own
+# timer, without holding up the script, and reruns the page once something has changed
+def auto_refresh(key):
+    if not st.checkbox("Auto-refresh", key=f"auto_refresh_{key}"):
+        return
+    
+    seen = st.session_state.get(f"pager_{key}_seen")
+    if seen is None:
+        seen = get_change_seq()
+    
+    @st.fragment(run_every=CHANGE_FEED_POLL_INTERVAL)
+    def watch_changes():
+        if get_change_seq() > seen:
+            st.rerun()
+    
+    watch_changes()
+
+# Table and operation filters above a queue
+def queue_filter_inputs(key):
+    col_table, col_operation = st.columns(2)
+    table = col_table.text_input("Filter by table", key=f"{key}_table_filter").strip().lower()
+    operation = col_operation.selectbox("Filter by operation", ("All",) + SQL_OPERATIONS,
+                                        key=f"{key}_operation_filter")
+    return table or None, None if operation == "All" else operation
+
+# One page of a status queue. Unfiltered queues are kept live from the change feed; each
+# filter combination pages on its own. The change sequence the rendered page reflects is kept
+# for auto_refresh.
+def filtered_queue_page(key, fetch_queue, status, table, operation):
+    if not table and not operation:
+        rows = paginate(key, fetch_queue, status)
+        st.session_state[f"pager_{key}_seen"] = st.session_state[f"pager_{key}_held"]["seq"]
+        return rows
+    # Read the sequence first, so anything logged during the fetch triggers a refresh
+    seq = get_change_seq()
+    rows = paginate(
+        f"{key}_{table}_{operation}",
+        lambda cursor: fetch_queue(cursor, table=table, operation=operation)
+    )
+    st.session_state[f"pager_{key}_seen"] = seq
+    return rows
+
+# Earlier requests with the same statement fingerprint, and how they were decided
+def similar_requests_section(request_id):
+    similar = get_similar_requests(request_id)
+    if not similar:
+        return
+    
+    exact = sum(1 for row in similar if row.exact_match)
+    with st.expander(f"Similar requests ({len(similar)}, {exact} identical)"):
+        st.caption("Same statement apart from literal values, newest first")
+        st.dataframe(records_frame(similar, ['request_id', 'exact_match', 'requestor', 'target_db',
+                                             'status', 'created_date', 'manager_username',
+                                             'manager_comments', 'support_comments']))
+
+# DataFrame of the given columns of some rows, for a table widget
+def records_frame(rows, columns):
+    return pd.DataFrame([[getattr(row, column) for column in columns] for row in rows], columns=columns)
+
+# Multi-select form applying one decision to several requests of the current page
+def bulk_decision_form(key, request_ids, apply_decision):
+    with st.expander("Bulk decision"):
+        with st.form(f"{key}_form"):
+            select_all = st.checkbox("Select all requests on this page")
+            selected = st.multiselect("Requests", request_ids)
+            decision = st.radio("Decision", ["Approve", "Reject"], key=f"{key}_decision")
+            comments = st.text_area("Comments", key=f"{key}_comments")
+            
+            submitted = st.form_submit_button("Submit Bulk Decision")
+            
+            if submitted:
+                chosen = request_ids if select_all else selected
+                if not chosen:
+                    st.error("Select at least one request")
+                else:
+                    updated, skipped = apply_decision(
+                        chosen, st.session_state.username, decision == "Approve", comments
+                    )
+                    st.session_state[f"{key}_report"] = (decision, updated, skipped)
+                    st.rerun()
+
+# Show the outcome of the last bulk decision (once, after the rerun)
+def show_bulk_report(key):
+    report = st.session_state.pop(key, None)
+    if report is None:
+        return
+    
+    decision, updated, skipped = report
+    action = "approved" if decision == "Approve" else "rejected"
+    if updated:
+        st.success(f"{len(updated)} request(s) {action} successfully!")
+    if skipped:
+        st.warning(f"{len(skipped)} request(s) were already processed and were skipped")
+        st.dataframe(pd.DataFrame(
+            [{"request_id": request_id, "current_status": status} for request_id, status in skipped.items()]
+        ))
+
+# Dry-run estimates for a request, with a button to (re)run the dry run
+def dry_run_section(request_details):
+    st.subheader("Dry Run")
+    
+    if request_details.rollout_mode:
+        st.info("Dry runs aren't available for multi-environment rollouts; review the targets below.")
+        return
+    
+    if request_details.dry_run_date is None:
+        st.info("No dry run yet.")
+    else:
+        col_rows, col_cost, col_date = st.columns(3)
+        rows = request_details.estimated_rows
+        col_rows.metric("Estimated rows", "unknown" if rows is None else f"{rows:,}")
+        cost = request_details.plan_cost
+        col_cost.metric("Plan cost", "n/a" if cost is None else f"{cost:,.1f}")
+        col_date.write(f"Run: {request_details.dry_run_date}")
+        with st.expander("Plan"):
+            st.code(request_details.dry_run_plan or "")
+    
+    label = "Run Dry Run" if request_details.dry_run_date is None else "Re-run Dry Run"
+    if st.button(label, key=f"dry_run_{request_details.request_id}"):
+        with st.spinner("Running dry run against the target..."):
+            _, error = dry_run_dml_request(request_details.request_id, force=True)
+        if error:
+            st.error(error)
+        else:
+            st.rerun()
 
 # Login page
+@timed("page.login")
 def login_page():
     st.header("Login")
     
@@ -321,20 +4158,26 @@ def login_page():
             st.session_state.username = user
             st.session_state.role = role
             st.success("Login successful!")
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("Invalid username or password")
 
 # New DML request page
+@timed("page.new_request")
 def new_request_page():
     st.header("Submit New DML Request")
     
     # Get available databases
-    conn = get_app_db_connection()
-    dbs = pd.read_sql_query("SELECT env_name, description FROM db_connections", conn)
-    conn.close()
+    db_options = [db.env_name for db in get_db_connections()]
     
-    db_options = dbs['env_name'].tolist() if not dbs.empty else []
+    mode = st.radio("Submission mode", ["Single request", "Multi-environment rollout", "Bulk import"],
+                    horizontal=True)
+    if mode == "Bulk import":
+        bulk_import_section(db_options)
+        return
+    if mode == "Multi-environment rollout":
+        rollout_request_section(db_options)
+        return
     
     # Form for DML submission
     with st.form("dml_request_form"):
@@ -357,78 +4200,225 @@ def new_request_page():
                     target_schema
                 )
                 st.success(f"Request submitted successfully! Request ID: {request_id}")
+                
+                similar = get_similar_requests(request_id)
+                if similar:
+                    st.warning(f"This statement matches {len(similar)} earlier request(s) apart from literal values")
+                    st.dataframe(records_frame(similar, ['request_id', 'requestor', 'target_db',
+                                                         'status', 'created_date']))
+
+# One request rolled out to several environments, concurrently or stage by stage
+def rollout_request_section(db_options):
+    dml_statement = st.text_area("DML Statement", height=200)
+    targets = st.multiselect("Target Databases", db_options)
+    target_schema = st.text_input("Target Schema")
+    gated = st.radio(
+        "Rollout mode", ["Concurrent", "Ordered stages"], horizontal=True
+    ) == "Ordered stages"
+    
+    # A stage runs only after every lower stage succeeded; equal stages run together
+    stages = {}
+    if gated:
+        for position, env in enumerate(targets, start=1):
+            stages[env] = st.number_input(f"Stage for {env}", min_value=1, value=position, step=1)
+    
+    if st.button("Submit Rollout Request"):
+        if not dml_statement.strip():
+            st.error("DML statement cannot be empty")
+        elif len(targets) < 2:
+            st.error("Select at least two target databases")
+        elif not target_schema.strip():
+            st.error("Target schema cannot be empty")
+        else:
+            request_id = create_rollout_request(
+                st.session_state.username,
+                dml_statement,
+                [(env, stages.get(env, 0)) for env in targets],
+                target_schema,
+                gated
+            )
+            st.success(f"Rollout request submitted successfully! Request ID: {request_id}")
+
+# Per-environment results of a rollout request
+def rollout_targets_section(request_details):
+    if request_details.rollout_mode:
+        st.subheader(f"Rollout Targets ({request_details.rollout_mode})")
+        st.dataframe(get_request_targets(request_details.request_id))
+
+# Bulk import of requests from an uploaded .sql or .csv file
+def bulk_import_section(db_options):
+    uploaded = st.file_uploader("Requests file", type=["sql", "csv"])
+    st.caption(
+        "SQL files hold one request per block, separated by a line containing only the "
+        "delimiter. CSV files need statement, target_db and target_schema columns."
+    )
+    
+    is_sql = uploaded is not None and uploaded.name.lower().endswith(".sql")
+    if is_sql:
+        target_db = st.selectbox("Target Database", db_options)
+        target_schema = st.text_input("Target Schema")
+        delimiter = st.text_input("Request delimiter", value="GO")
+    
+    if uploaded is not None and st.button("Import Requests"):
+        if is_sql and not target_schema.strip():
+            st.error("Target schema cannot be empty")
+            return
+        
+        # Stream the upload line by line instead of decoding it all at once
+        lines = io.TextIOWrapper(uploaded, encoding="utf-8", newline="")
+        if is_sql:
+            rows = iter_sql_file_requests(lines, target_db, target_schema.strip(), delimiter.strip())
+        else:
+            rows = iter_csv_requests(lines)
+        
+        progress = st.empty()
+        try:
+            summary = import_dml_requests(
+                st.session_state.username, rows, db_options,
+                on_batch=lambda imported: progress.write(f"Imported {imported} request(s)...")
+            )
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            st.error(f"Import failed: {e}")
+            return
+        
+        st.success(f"Imported {summary['imported']} request(s)")
+        if summary["rejected"]:
+            st.warning(
+                f"Rejected {summary['rejected']} row(s)"
+                + (f" (showing the first {len(summary['errors'])})"
+                   if summary["rejected"] > len(summary["errors"]) else "")
+            )
+            st.dataframe(pd.DataFrame(summary["errors"], columns=["line", "error"]))
 
 # View my requests page
+@timed("page.my_requests")
 def my_requests_page():
     st.header("My DML Requests")
     
-    requests_df = get_user_requests(st.session_state.username)
+    requests = paginate(
+        "my_requests",
+        lambda cursor: get_user_requests(st.session_state.username, cursor)
+    )
     
-    if requests_df.empty:
+    if not requests:
         st.info("You haven't submitted any DML requests yet.")
     else:
         # Display requests in a table
-        st.dataframe(requests_df[['request_id', 'dml_statement', 'target_db', 
-                                  'target_schema', 'status', 'created_date']])
+        st.dataframe(records_frame(requests, ['request_id', 'statement_preview',
+                                              'statement_size', 'target_db', 'target_schema',
+                                              'status', 'created_date']))
         
         # Allow viewing details of a specific request
-        request_ids = requests_df['request_id'].tolist()
+        request_ids = [row.request_id for row in requests]
         selected_request = st.selectbox("Select a request to view details", request_ids)
         
-        if selected_request:
-            request_details = requests_df[requests_df['request_id'] == selected_request].iloc[0]
-            
+        request_details = get_request(selected_request) if selected_request else None
+        
+        if request_details:
             st.subheader("Request Details")
-            st.write(f"Status: {request_details['status']}")
-            st.write(f"Created: {request_details['created_date']}")
+            st.write(f"Status: {request_details.status}")
+            st.write(f"Created: {request_details.created_date}")
             
             st.subheader("DML Statement")
-            st.code(request_details['dml_statement'], language="sql")
+            st.code(request_details.dml_statement, language="sql")
             
             # Display approval information if available
-            if not pd.isna(request_details['manager_username']):
+            if request_details.manager_username is not None:
                 st.subheader("Manager Review")
-                st.write(f"Manager: {request_details['manager_username']}")
-                st.write(f"Date: {request_details['manager_action_date']}")
-                st.write(f"Comments: {request_details['manager_comments']}")
+                st.write(f"Manager: {request_details.manager_username}")
+                st.write(f"Date: {request_details.manager_action_date}")
+                st.write(f"Comments: {request_details.manager_comments}")
             
-            if not pd.isna(request_details['support_username']):
+            if request_details.support_username is not None:
                 st.subheader("Production Support Review")
-                st.write(f"Support: {request_details['support_username']}")
-                st.write(f"Date: {request_details['support_action_date']}")
-                st.write(f"Comments: {request_details['support_comments']}")
+                st.write(f"Support: {request_details.support_username}")
+                st.write(f"Date: {request_details.support_action_date}")
+                st.write(f"Comments: {request_details.support_comments}")
             
-            if not pd.isna(request_details['execution_date']):
+            if request_details.execution_date is not None:
                 st.subheader("Execution Details")
-                st.write(f"Date: {request_details['execution_date']}")
-                st.write(f"Result: {request_details['execution_result']}")
+                st.write(f"Date: {request_details.execution_date}")
+                st.write(f"Result: {request_details.execution_result}")
+            
+            rollout_targets_section(request_details)
+
+# Full-text search over request history; requestors only search their own requests
+@timed("page.search")
+def search_page():
+    st.header("Search Requests")
+    
+    text = st.text_input("Search statements, comments and results",
+                         help="All words must match; end a word with * to match a prefix")
+    
+    # Start from the first page whenever the search changes
+    if st.session_state.get("search_text") != text:
+        st.session_state.search_text = text
+        st.session_state.pop("pager_search", None)
+    
+    if not text.strip():
+        return
+    
+    requestor = st.session_state.username if st.session_state.role == "requestor" else None
+    results = paginate("search", lambda cursor: search_requests(text, requestor, cursor))
+    
+    if not results:
+        st.info("No matching requests.")
+        return
+    
+    st.dataframe(records_frame(results, ['request_id', 'match', 'requestor', 'target_db',
+                                         'target_schema', 'status', 'created_date']))
+    
+    selected_request = st.selectbox("Select a request to view details", [row.request_id for row in results])
+    request_details = get_request(selected_request) if selected_request else None
+    
+    if request_details:
+        st.write(f"Status: {request_details.status}")
+        st.code(request_details.dml_statement, language="sql")
+        if request_details.manager_comments:
+            st.write(f"Manager comments: {request_details.manager_comments}")
+        if request_details.support_comments:
+            st.write(f"Support comments: {request_details.support_comments}")
+        if request_details.execution_result:
+            st.write(f"Result: {request_details.execution_result}")
 
 # Manager approval page
+@timed("page.manager_approval")
 def manager_approval_page():
     st.header("Pending Manager Approvals")
     
-    pending_requests = get_pending_manager_requests()
+    show_bulk_report("manager_bulk_report")
+    table, operation = queue_filter_inputs("manager_pending")
+    pending_requests = filtered_queue_page("manager_pending", get_pending_manager_requests, STATUS_PENDING_MANAGER, table, operation)
     
-    if pending_requests.empty:
+    if not pending_requests:
         st.info("No requests pending approval.")
     else:
         # Display pending requests
-        st.dataframe(pending_requests[['request_id', 'requestor', 'dml_statement', 
-                                     'target_db', 'target_schema', 'created_date']])
+        st.dataframe(records_frame(pending_requests, ['request_id', 'requestor',
+                                                      'statement_preview', 'statement_size',
+                                                      'target_db', 'target_schema',
+                                                      'created_date']))
+        
+        bulk_decision_form(
+            "manager_bulk", [row.request_id for row in pending_requests], bulk_manager_decision
+        )
         
         # Select a request to review
-        request_ids = pending_requests['request_id'].tolist()
+        request_ids = [row.request_id for row in pending_requests]
         selected_request = st.selectbox("Select a request to review", request_ids)
         
-        if selected_request:
-            request_details = pending_requests[pending_requests['request_id'] == selected_request].iloc[0]
-            
+        request_details = get_request(selected_request) if selected_request else None
+        
+        if request_details:
             st.subheader("Request Details")
-            st.write(f"Requestor: {request_details['requestor']}")
-            st.write(f"Created: {request_details['created_date']}")
+            st.write(f"Requestor: {request_details.requestor}")
+            st.write(f"Created: {request_details.created_date}")
             
             st.subheader("DML Statement")
-            st.code(request_details['dml_statement'], language="sql")
+            st.code(request_details.dml_statement, language="sql")
+            
+            rollout_targets_section(request_details)
+            similar_requests_section(selected_request)
             
             # Approval form
             with st.form("manager_approval_form"):
@@ -439,63 +4429,80 @@ def manager_approval_page():
                 
                 if submitted:
                     approved = decision == "Approve"
-                    update_manager_decision(
+                    updated = update_manager_decision(
                         selected_request, 
                         st.session_state.username, 
                         approved, 
                         comments
                     )
                     
-                    status = "approved" if approved else "rejected"
-                    st.success(f"Request {status} successfully!")
-                    st.experimental_rerun()
+                    if updated:
+                        status = "approved" if approved else "rejected"
+                        st.success(f"Request {status} successfully!")
+                    else:
+                        st.warning("Request was already processed by someone else")
+                    st.rerun()
+    
+    auto_refresh("manager_pending")
 
 # Manager decisions page
+@timed("page.manager_decisions")
 def manager_decisions_page():
     st.header("My Manager Decisions")
     
-    conn = get_app_db_connection()
-    decisions_df = pd.read_sql_query(
-        "SELECT * FROM dml_requests WHERE manager_username = ? ORDER BY manager_action_date DESC",
-        conn, params=(st.session_state.username,)
+    decisions = paginate(
+        "manager_decisions",
+        lambda cursor: get_manager_decisions(st.session_state.username, cursor)
     )
-    conn.close()
     
-    if decisions_df.empty:
+    if not decisions:
         st.info("You haven't made any decisions yet.")
     else:
-        st.dataframe(decisions_df[['request_id', 'requestor', 'status', 
-                                 'manager_action_date', 'manager_comments']])
+        st.dataframe(records_frame(decisions, ['request_id', 'requestor', 'status',
+                                               'manager_action_date', 'manager_comments']))
 
 # Production support approval page
+@timed("page.prod_support_approval")
 def prod_support_approval_page():
     st.header("Pending Production Support Approvals")
     
-    pending_requests = get_pending_prod_requests()
+    show_bulk_report("prod_bulk_report")
+    table, operation = queue_filter_inputs("prod_pending")
+    pending_requests = filtered_queue_page("prod_pending", get_pending_prod_requests, STATUS_PENDING_PROD, table, operation)
     
-    if pending_requests.empty:
+    if not pending_requests:
         st.info("No requests pending approval.")
     else:
         # Display pending requests
-        st.dataframe(pending_requests[['request_id', 'requestor', 'dml_statement', 
-                                     'target_db', 'target_schema', 'created_date', 
-                                     'manager_username']])
+        st.dataframe(records_frame(pending_requests, ['request_id', 'requestor',
+                                                      'statement_preview', 'statement_size',
+                                                      'target_db', 'target_schema',
+                                                      'created_date', 'manager_username',
+                                                      'estimated_rows', 'plan_cost']))
+        
+        bulk_decision_form(
+            "prod_bulk", [row.request_id for row in pending_requests], bulk_prod_support_decision
+        )
         
         # Select a request to review
-        request_ids = pending_requests['request_id'].tolist()
+        request_ids = [row.request_id for row in pending_requests]
         selected_request = st.selectbox("Select a request to review", request_ids)
         
-        if selected_request:
-            request_details = pending_requests[pending_requests['request_id'] == selected_request].iloc[0]
-            
+        request_details = get_request(selected_request) if selected_request else None
+        
+        if request_details:
             st.subheader("Request Details")
-            st.write(f"Requestor: {request_details['requestor']}")
-            st.write(f"Created: {request_details['created_date']}")
-            st.write(f"Manager Approved: {request_details['manager_username']}")
-            st.write(f"Manager Comments: {request_details['manager_comments']}")
+            st.write(f"Requestor: {request_details.requestor}")
+            st.write(f"Created: {request_details.created_date}")
+            st.write(f"Manager Approved: {request_details.manager_username}")
+            st.write(f"Manager Comments: {request_details.manager_comments}")
             
             st.subheader("DML Statement")
-            st.code(request_details['dml_statement'], language="sql")
+            st.code(request_details.dml_statement, language="sql")
+            
+            dry_run_section(request_details)
+            rollout_targets_section(request_details)
+            similar_requests_section(selected_request)
             
             # Approval form
             with st.form("support_approval_form"):
@@ -506,59 +4513,415 @@ def prod_support_approval_page():
                 
                 if submitted:
                     approved = decision == "Approve"
-                    update_prod_support_decision(
+                    updated = update_prod_support_decision(
                         selected_request, 
                         st.session_state.username, 
                         approved, 
                         comments
                     )
                     
-                    status = "approved" if approved else "rejected"
-                    st.success(f"Request {status} successfully!")
-                    st.experimental_rerun()
+                    if updated:
+                        status = "approved" if approved else "rejected"
+                        st.success(f"Request {status} successfully!")
+                    else:
+                        st.warning("Request was already processed by someone else")
+                    st.rerun()
+    
+    auto_refresh("prod_pending")
 
 # Execute approved requests page
+@timed("page.execute_approved")
 def execute_approved_page():
     st.header("Execute Approved Requests")
     
-    conn = get_app_db_connection()
-    approved_df = pd.read_sql_query(
-        f"SELECT * FROM dml_requests WHERE status = '{STATUS_APPROVED}'",
-        conn
-    )
-    conn.close()
+    table, operation = queue_filter_inputs("approved")
+    approved = filtered_queue_page("approved", get_approved_requests, STATUS_APPROVED, table, operation)
     
-    if approved_df.empty:
+    # A group run may have just emptied the queue, so its report goes first
+    show_group_report("group_execution_report")
+    
+    if not approved:
         st.info("No approved requests pending execution.")
     else:
         # Display approved requests
-        st.dataframe(approved_df[['request_id', 'requestor', 'dml_statement', 
-                                'target_db', 'target_schema', 'created_date']])
+        st.dataframe(records_frame(approved, ['request_id', 'requestor', 'statement_preview',
+                                              'statement_size', 'target_db', 'target_schema',
+                                              'created_date', 'estimated_rows', 'plan_cost']))
+        
+        group_execution_form("group_execution", approved)
         
         # Select a request to execute
-        request_ids = approved_df['request_id'].tolist()
+        request_ids = [row.request_id for row in approved]
         selected_request = st.selectbox("Select a request to execute", request_ids)
         
-        if selected_request:
-            request_details = approved_df[approved_df['request_id'] == selected_request].iloc[0]
-            
+        request_details = get_request(selected_request) if selected_request else None
+        
+        if request_details:
             st.subheader("Request Details")
-            st.write(f"Requestor: {request_details['requestor']}")
-            st.write(f"Target: {request_details['target_db']}.{request_details['target_schema']}")
+            st.write(f"Requestor: {request_details.requestor}")
+            st.write(f"Target: {request_details.target_db}.{request_details.target_schema}")
             
             st.subheader("DML Statement")
-            st.code(request_details['dml_statement'], language="sql")
+            st.code(request_details.dml_statement, language="sql")
+            
+            dry_run_section(request_details)
+            rollout_targets_section(request_details)
+            schedule_form(selected_request)
             
             # Execute button
             if st.button("Execute DML"):
-                success, result = execute_dml_request(selected_request)
+                job_id = enqueue_execution(selected_request, st.session_state.username)
                 
-                if success:
-                    st.success("DML executed successfully!")
+                if job_id:
+                    st.success(f"Execution queued (job {job_id})")
                 else:
-                    st.error(f"Execution failed: {result}")
+                    st.error("Request is no longer approved for execution")
                 
-                st.experimental_rerun()
+                st.rerun()
+    
+    scheduled_executions_section()
+    resumable_requests_section()
+    execution_jobs_section()
+    
+    auto_refresh("approved")
+
+# Run several approved requests for one target together on a single connection
+def group_execution_form(key, approved):
+    with st.expander("Execute as a group"):
+        with st.form(f"{key}_form"):
+            targets = sorted({(row.target_db, row.target_schema) for row in approved})
+            target = st.selectbox("Target", targets, format_func=lambda target: f"{target[0]}.{target[1]}")
+            selected = st.multiselect(
+                "Requests (only those for the chosen target are run)",
+                [row.request_id for row in approved]
+            )
+            mode = st.radio(
+                "Commit", [GROUP_ATOMIC, GROUP_SAVEPOINT],
+                format_func=lambda mode: {
+                    GROUP_ATOMIC: "All or nothing (one transaction)",
+                    GROUP_SAVEPOINT: "Keep successful requests (savepoint per request)",
+                }[mode]
+            )
+            
+            if st.form_submit_button("Execute Group"):
+                chosen = [row.request_id for row in approved
+                          if row.request_id in selected and (row.target_db, row.target_schema) == target]
+                if not chosen:
+                    st.error("Select at least one request for the chosen target")
+                else:
+                    # Don't queue behind background jobs on the same target; the group itself
+                    # runs on the execution engine, off the page
+                    engine = get_execution_engine()
+                    slot = engine.env_slot(target[0])
+                    if not slot.acquire(blocking=False):
+                        st.error(f"{target[0]} is busy with other executions; try again shortly")
+                        return
+                    st.session_state[f"{key}_report"] = engine.submit_group(
+                        chosen, st.session_state.username, mode, slot
+                    )
+                    st.rerun()
+
+# Show the per-request outcome of the last grouped execution once it has finished (once)
+def show_group_report(key):
+    future = st.session_state.get(key)
+    if future is None:
+        return
+    if not future.done():
+        st.info("Group execution is running; its jobs are listed under Execution Jobs below.")
+        return
+    
+    del st.session_state[key]
+    try:
+        outcomes = future.result()
+    except ValueError as e:
+        st.error(str(e))
+        return
+    
+    executed = sum(1 for _, status, _ in outcomes if status == STATUS_EXECUTED)
+    if executed == len(outcomes):
+        st.success(f"All {executed} request(s) executed successfully!")
+    else:
+        st.warning(f"{executed} of {len(outcomes)} request(s) executed")
+    st.dataframe(pd.DataFrame(outcomes, columns=["request_id", "status", "result"]))
+
+# Schedule the selected approved request for a later start or a maintenance window
+def schedule_form(request_id):
+    with st.expander("Schedule for a maintenance window"):
+        with st.form(f"schedule_{request_id}"):
+            col_date, col_time = st.columns(2)
+            start_date = col_date.date_input("Earliest run date", value=datetime.date.today())
+            start_time = col_time.time_input("Earliest run time", value=datetime.time(0, 0))
+            use_window = st.checkbox("Only run inside a daily window")
+            col_start, col_end = st.columns(2)
+            window_start = col_start.time_input("Window opens", value=datetime.time(22, 0))
+            window_end = col_end.time_input("Window closes", value=datetime.time(6, 0))
+            priority = st.number_input("Priority (higher runs first)", value=0, step=1)
+            
+            if st.form_submit_button("Schedule Execution"):
+                scheduled = schedule_execution(
+                    request_id, st.session_state.username,
+                    not_before=datetime.datetime.combine(start_date, start_time),
+                    window_start=window_start.strftime("%H:%M") if use_window else None,
+                    window_end=window_end.strftime("%H:%M") if use_window else None,
+                    priority=int(priority)
+                )
+                if scheduled:
+                    st.success("Execution scheduled")
+                else:
+                    st.error("Request is no longer approved for execution")
+
+# Scheduled executions waiting for their window or running now
+def scheduled_executions_section():
+    st.subheader("Scheduled Executions")
+    
+    scheduled_df = get_scheduled_executions()
+    
+    if scheduled_df.empty:
+        st.info("No scheduled executions.")
+        return
+    
+    st.dataframe(scheduled_df)
+    
+    pending = scheduled_df[scheduled_df['status'] == SCHEDULE_PENDING]['request_id'].tolist()
+    if pending:
+        request_to_unschedule = st.selectbox("Select a request to unschedule", pending)
+        if st.button("Unschedule"):
+            if unschedule_execution(request_to_unschedule, st.session_state.username):
+                st.success("Execution unscheduled")
+            else:
+                st.error("Execution has already started")
+
+# Failed chunked executions that can pick up after their last committed batch
+def resumable_requests_section():
+    st.subheader("Resume Failed Executions")
+    
+    failed = paginate("resumable", get_resumable_requests)
+    
+    if not failed:
+        st.info("No failed executions to resume.")
+        return
+    
+    st.dataframe(records_frame(failed, ['request_id', 'requestor', 'target_db',
+                                        'target_schema', 'statements_executed',
+                                        'statement_count', 'rows_affected', 'execution_date']))
+    
+    request_to_resume = st.selectbox("Select a request to resume", [row.request_id for row in failed])
+    request_details = get_request(request_to_resume) if request_to_resume else None
+    if request_details:
+        st.write(f"Last result: {request_details.execution_result}")
+        rollout_targets_section(request_details)
+    
+    if st.button("Resume Execution"):
+        job_id = resume_execution(request_to_resume, st.session_state.username)
+        
+        if job_id:
+            st.success(f"Resume queued (job {job_id})")
+        else:
+            st.error("Request can no longer be resumed")
+        
+        st.rerun()
+
+# Background execution jobs, with cancellation and polling
+def execution_jobs_section():
+    st.subheader("Execution Jobs")
+    
+    col_refresh, col_auto = st.columns(2)
+    if col_refresh.button("Refresh"):
+        st.rerun()
+    auto = col_auto.checkbox("Auto-refresh jobs", value=True, key="execution_jobs_auto_refresh")
+    
+    # The job list refreshes on its own timer as a fragment, leaving the rest of the page alone
+    @st.fragment(run_every=EXECUTOR_STATUS_REFRESH_INTERVAL if auto else None)
+    def jobs_table():
+        jobs_df = get_execution_jobs()
+        
+        if jobs_df.empty:
+            st.info("No execution jobs yet.")
+            return
+        
+        st.dataframe(jobs_df)
+        
+        active_jobs = jobs_df[jobs_df['status'].isin(JOB_ACTIVE_STATES)]['job_id'].tolist()
+        if active_jobs:
+            job_to_cancel = st.selectbox("Select a job to cancel", active_jobs)
+            if st.button("Cancel Job"):
+                if cancel_execution(job_to_cancel, st.session_state.username):
+                    st.success("Cancellation requested")
+                else:
+                    st.error("Job could not be cancelled")
+    
+    jobs_table()
+
+# Operations metrics page: stage latency percentiles plus pool and cache statistics
+@timed("page.operations_metrics")
+def operations_metrics_page():
+    st.header("Operations Metrics")
+    
+    # Make sure the latest samples are visible
+    flush_metrics()
+    
+    window = st.selectbox("Window", ["Last hour", "Last 24 hours", "Last 7 days"], index=1)
+    hours = {"Last hour": 1, "Last 24 hours": 24, "Last 7 days": 24 * 7}[window]
+    
+    summary_df = get_stage_latency_summary(hours)
+    
+    if summary_df.empty:
+        st.info("No timings recorded in this window.")
+    else:
+        stages = sorted(summary_df['stage'].unique())
+        selected_stages = st.multiselect("Stages", stages, default=stages)
+        summary_df = summary_df[summary_df['stage'].isin(selected_stages)]
+        
+        st.subheader("Latency by Stage and Target (ms)")
+        st.dataframe(summary_df)
+        
+        st.subheader("p95 Latency by Stage (ms)")
+        st.bar_chart(summary_df.groupby('stage')['p95_ms'].max())
+    
+    col_pool, col_cache = st.columns(2)
+    with col_pool:
+        st.subheader("Connection Pools")
+        st.json(get_engine_pool_stats())
+        st.subheader("Application Store")
+        st.json(get_app_store_stats())
+    with col_cache:
+        st.subheader("Query Cache")
+        st.json(get_query_cache_stats())
+    
+    archive_section()
+
+# Workflow analytics page: turnaround, throughput and failure rate, read from the rollups only
+def workflow_analytics_page():
+    st.header("Workflow Analytics")
+    
+    windows = {
+        "Last 24 hours": ("hour", 1),
+        "Last 7 days": ("hour", 7),
+        "Last 30 days": ("day", 30),
+        "Last 90 days": ("day", 90),
+        "Last 365 days": ("day", 365),
+    }
+    col_window, col_env = st.columns(2)
+    granularity, days = windows[col_window.selectbox("Window", list(windows), index=2)]
+    environments = ["All"] + [row.env_name for row in get_db_connections()]
+    target_db = col_env.selectbox("Environment", environments)
+    target_db = None if target_db == "All" else target_db
+    since = workflow_bucket(granularity, datetime.datetime.now() - datetime.timedelta(days=days))
+    
+    rollups = get_workflow_rollups(granularity, since, target_db)
+    if not rollups:
+        st.info("No reviews or executions in this window.")
+        return
+    
+    rollup_df = records_frame(rollups, ['bucket_start', 'stage', 'outcome', 'transitions', 'total_seconds'])
+    stage_totals = rollup_df.groupby('stage')['transitions'].sum()
+    outcome_totals = rollup_df.groupby(['stage', 'outcome'])['transitions'].sum()
+    executed = outcome_totals.get(('execution', 'executed'), 0)
+    failed = outcome_totals.get(('execution', 'failed'), 0)
+    
+    col_manager, col_support, col_executed, col_failure = st.columns(4)
+    col_manager.metric("Manager decisions", int(stage_totals.get('manager', 0)))
+    col_support.metric("Support decisions", int(stage_totals.get('support', 0)))
+    col_executed.metric("Executions", int(executed + failed))
+    col_failure.metric("Failure rate", f"{failed / (executed + failed):.1%}" if executed + failed else "n/a")
+    
+    st.subheader(f"Throughput per {granularity}")
+    st.line_chart(rollup_df.pivot_table(index='bucket_start', columns='stage', values='transitions',
+                                        aggfunc='sum', fill_value=0))
+    
+    executions = rollup_df[rollup_df['stage'] == 'execution']
+    if not executions.empty:
+        st.subheader(f"Execution failure rate per {granularity}")
+        counts = executions.pivot_table(index='bucket_start', columns='outcome', values='transitions',
+                                        aggfunc='sum', fill_value=0)
+        st.line_chart(counts.get('failed', 0) / counts.sum(axis=1))
+    
+    st.subheader("Turnaround from submission by environment (minutes)")
+    st.caption("Percentiles are approximate (histogram bins about 19% wide)")
+    st.dataframe(records_frame(get_workflow_latency(granularity, since, "target_db", target_db),
+                               ['stage', 'target_db', 'transitions', 'avg_minutes', 'p50_minutes',
+                                'p90_minutes', 'p99_minutes', 'max_minutes']))
+    
+    st.subheader("Turnaround from submission by approver (minutes)")
+    st.dataframe(records_frame(get_workflow_latency(granularity, since, "approver", target_db),
+                               ['stage', 'approver', 'transitions', 'avg_minutes', 'p50_minutes',
+                                'p90_minutes', 'p99_minutes', 'max_minutes']))
+
+# Audit export page: stream the filtered request history to a CSV or Parquet file, then download it
+def audit_export_page():
+    st.header("Audit Export")
+    
+    with st.form("audit_export_form"):
+        col_start, col_end = st.columns(2)
+        start = col_start.date_input("Created from", value=datetime.date.today() - datetime.timedelta(days=90))
+        end = col_end.date_input("Created through", value=datetime.date.today())
+        statuses = st.multiselect("Statuses (all if none)", [
+            STATUS_PENDING_MANAGER, STATUS_REJECTED_MANAGER, STATUS_PENDING_PROD, STATUS_REJECTED_PROD,
+            STATUS_APPROVED, STATUS_EXECUTING, STATUS_EXECUTED, STATUS_FAILED,
+        ])
+        target_dbs = st.multiselect("Environments (all if none)", [row.env_name for row in get_db_connections()])
+        export_format = st.radio("Format", list(EXPORT_WRITERS), format_func=str.upper, horizontal=True)
+        submitted = st.form_submit_button("Export")
+    
+    if submitted:
+        where, params = export_filter(
+            datetime.datetime.combine(start, datetime.time.min),
+            datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min),
+            statuses, target_dbs
+        )
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = os.path.join(
+            EXPORT_DIR,
+            f"dml_requests_{start:%Y%m%d}_{end:%Y%m%d}_{uuid.uuid4().hex[:8]}.{export_format}"
+        )
+        progress = st.progress(0.0, text="Starting export...")
+        
+        def on_progress(written, total):
+            progress.progress(min(written / total, 1.0) if total else 1.0,
+                              text=f"Exported {written:,} of {total:,} requests")
+        
+        try:
+            written = export_requests(path, export_format, where, params, on_progress=on_progress)
+        except ImportError:
+            st.error("Parquet export needs the pyarrow package")
+            return
+        progress.progress(1.0, text=f"Exported {written:,} requests")
+        st.session_state.audit_export = path
+    
+    path = st.session_state.get("audit_export")
+    if path and os.path.exists(path):
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        if size_mb <= EXPORT_DOWNLOAD_MAX_MB:
+            # The file is read when the button is clicked, not on every rerun, and the button
+            # goes away once it has been served
+            st.download_button(
+                "Download export", functools.partial(read_export, path), file_name=os.path.basename(path),
+                on_click=lambda: st.session_state.pop("audit_export", None)
+            )
+        else:
+            st.warning(f"The export is {size_mb:,.0f} MB, over the {EXPORT_DOWNLOAD_MAX_MB:g} MB "
+                       "download limit; fetch it from the server instead.")
+        st.caption(f"Saved on the server as {path} for {EXPORT_RETENTION_HOURS:g} hours. For very large "
+                   "exports, 'python maintenance.py export' writes the file without going through the browser.")
+
+# Request counts in the main and archive tables, with a manual archive trigger
+def archive_section():
+    st.subheader("Request Archive")
+    
+    with app_db() as conn:
+        active_count = conn.execute("SELECT COUNT(*) FROM dml_requests").fetchone()[0]
+        archived_count = conn.execute("SELECT COUNT(*) FROM dml_requests_archive").fetchone()[0]
+    
+    col_active, col_archived = st.columns(2)
+    col_active.metric("Active requests", active_count)
+    col_archived.metric("Archived requests", archived_count)
+    
+    retention_days = st.number_input(
+        "Archive finished requests older than (days)", min_value=1, value=ARCHIVE_RETENTION_DAYS
+    )
+    if st.button("Archive Now"):
+        archived = archive_terminal_requests(int(retention_days))
+        st.success(f"Archived {archived} requests.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
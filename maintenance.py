@@ -0,0 +1,96 @@
+# maintenance.py
+import argparse
+import datetime
+import sys
+import time
+from main import (
+    ARCHIVE_BATCH_SIZE, ARCHIVE_RETENTION_DAYS, EXPORT_CHUNK_SIZE, EXPORT_WRITERS, SCHEDULER_POLL_INTERVAL,
+    SCHEDULER_TARGET_RATE, SCHEDULER_WORKERS, ExecutionScheduler, archive_terminal_requests, export_filter,
+    export_requests, flush_metrics, get_env_slots, get_execution_heartbeat, init_app_db, prune_exports,
+    prune_request_changes, prune_workflow_rollups
+)
+
+def archive(args):
+    """Archive old terminal requests; prune the change log, hourly rollups and expired page exports"""
+    archived = archive_terminal_requests(args.retention_days, args.batch_size)
+    print(f"Archived {archived} requests older than {args.retention_days} days")
+    pruned = prune_request_changes()
+    print(f"Pruned {pruned} change-log entries")
+    pruned = prune_workflow_rollups()
+    print(f"Pruned {pruned} hourly workflow rollups")
+    pruned = prune_exports()
+    print(f"Deleted {pruned} expired export file(s)")
+
+def scheduler(args):
+    """Run the maintenance-window scheduler in the foreground (set DML_SCHEDULER_ENABLED=0 for the app)"""
+    runner = ExecutionScheduler(SCHEDULER_POLL_INTERVAL, SCHEDULER_WORKERS,
+                                get_env_slots(), SCHEDULER_TARGET_RATE)
+    if args.once:
+        # Keep the heartbeat going while the groups run, so other replicas leave them alone
+        get_execution_heartbeat()
+        runner.recover()
+        futures = runner.run_once()
+        # Stopping ends groups early, so let them finish first
+        for future in futures:
+            future.result()
+        runner.stop()
+        print(f"Started {len(futures)} execution group(s)")
+        return
+    
+    runner.start()
+    print("Scheduler running; press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(60)
+            flush_metrics()
+    except KeyboardInterrupt:
+        runner.stop()
+
+def export(args):
+    """Stream the request history, active and archived, to a CSV or Parquet file"""
+    where, params = export_filter(args.since, args.until, args.status, args.env)
+    def on_progress(written, total):
+        print(f"\rExported {written:,} of {total:,} requests", end="", file=sys.stderr, flush=True)
+    written = export_requests(args.output, args.format, where, params, args.chunk_size, on_progress)
+    print(f"\nWrote {written} requests to {args.output}")
+
+def parse_date(value):
+    return datetime.datetime.fromisoformat(value)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Maintenance tasks for the DML tool database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    archive_parser = subparsers.add_parser("archive", help="Archive old executed, failed and rejected requests")
+    archive_parser.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS,
+                                help="Keep requests newer than this in the main table")
+    archive_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE,
+                                help="Requests moved per transaction")
+    archive_parser.set_defaults(handler=archive)
+    
+    scheduler_parser = subparsers.add_parser("scheduler", help="Run scheduled executions as their windows open")
+    scheduler_parser.add_argument("--once", action="store_true",
+                                  help="Start whatever is due now, wait for it and exit")
+    scheduler_parser.set_defaults(handler=scheduler)
+    
+    export_parser = subparsers.add_parser("export", help="Export the request history for auditors")
+    export_parser.add_argument("output", help="File to write")
+    export_parser.add_argument("--format", choices=sorted(EXPORT_WRITERS), default="csv", help="Output format")
+    export_parser.add_argument("--since", type=parse_date, help="Only requests created at or after this date")
+    export_parser.add_argument("--until", type=parse_date, help="Only requests created before this date")
+    export_parser.add_argument("--status", action="append", default=[], help="Only this status (repeatable)")
+    export_parser.add_argument("--env", action="append", default=[], help="Only this target_db (repeatable)")
+    export_parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE,
+                               help="Rows read and written per chunk")
+    export_parser.set_defaults(handler=export)
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    init_app_db()
+    args.handler(args)
+    flush_metrics()
+
+if __name__ == "__main__":
+    main()
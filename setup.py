@@ -1,41 +1,30 @@
 # setup.py
-import sqlite3
-import hashlib
-from main import get_app_db_connection, init_app_db
+from main import app_transaction, hash_password, init_app_db, invalidate_engine
 
 def create_user(username, password, role, email):
     """Create a new user in the system"""
-    conn = get_app_db_connection()
-    cursor = conn.cursor()
-    
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
-    
-    cursor.execute(
-        """
-        INSERT OR REPLACE INTO users (username, password_hash, role, email)
-        VALUES (?, ?, ?, ?)
-        """,
-        (username, password_hash, role, email)
-    )
-    
-    conn.commit()
-    conn.close()
+    with app_transaction() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO users (username, password_hash, role, email)
+            VALUES (?, ?, ?, ?)
+            """,
+            (username, hash_password(password), role, email)
+        )
 
 def add_db_connection(env_name, connection_string, description):
     """Add a new database connection to the db_connections table."""
-    conn = get_app_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        """
-        INSERT OR REPLACE INTO db_connections (env_name, connection_string, description)
-        VALUES (?, ?, ?)
-        """,
-        (env_name, connection_string, description)
-    )
-    
-    conn.commit()
-    conn.close()
+    with app_transaction() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO db_connections (env_name, connection_string, description)
+            VALUES (?, ?, ?)
+            """,
+            (env_name, connection_string, description)
+        )
+    
+    # Make sure the next execution picks up the new connection string
+    invalidate_engine(env_name)
 
 def main():
     # Initialize the database schema